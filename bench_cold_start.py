@@ -0,0 +1,147 @@
+"""
+Cold-start benchmark: time to first response in a fresh interpreter.
+
+Each run spawns a new Python process that imports main.py and serves a single
+request by calling the ASGI app directly (no server, no lifespan, as on a
+serverless cold start), against the local fake weather server. With --lifespan
+the app's startup hook runs first, as under uvicorn, and is timed separately.
+Reports medians over all runs so the numbers can be tracked between commits.
+
+Usage:
+    python bench_cold_start.py --runs 10
+    python bench_cold_start.py --route /metrics --json
+    python bench_cold_start.py --lifespan
+    python bench_cold_start.py --app-dir ../older-checkout   # compare another tree
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from fake_weather_server import make_server
+
+HEAVY_MODULES = ("numpy", "httpx", "dotenv", "cProfile", "pstats")
+
+CHILD = r"""
+import asyncio, json, sys, time
+t0 = time.perf_counter()
+import main
+t_import = time.perf_counter()
+loaded_at_import = [m for m in HEAVY_MODULES if m in sys.modules]
+
+method, path, body, run_lifespan = sys.argv[1], sys.argv[2], sys.argv[3].encode(), sys.argv[4] == "1"
+scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method, "scheme": "http",
+         "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+         "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+         "client": ("127.0.0.1", 1), "server": ("127.0.0.1", 80)}
+status = {}
+
+async def serve():
+    sent = False
+    async def receive():
+        nonlocal sent
+        if sent:
+            await asyncio.sleep(3600)
+        sent = True
+        return {"type": "http.request", "body": body, "more_body": False}
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status["code"] = message["status"]
+    await main.app(scope, receive, send)
+
+async def main_task():
+    global t_ready
+    if not run_lifespan:
+        t_ready = time.perf_counter()
+        await serve()
+        return
+    async with main.app.router.lifespan_context(main.app):
+        t_ready = time.perf_counter()
+        await serve()
+
+asyncio.run(main_task())
+t_response = time.perf_counter()
+print(json.dumps({
+    "import_ms": (t_import - t0) * 1000,
+    "startup_ms": (t_ready - t_import) * 1000,
+    "first_response_ms": (t_response - t_ready) * 1000,
+    "status": status.get("code"),
+    "loaded_at_import": loaded_at_import,
+    "loaded_after_response": [m for m in HEAVY_MODULES if m in sys.modules],
+}))
+""".replace("HEAVY_MODULES", repr(HEAVY_MODULES))
+
+
+def run_once(app_dir: str, env: dict, method: str, route: str, body: str, lifespan: bool) -> dict:
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-c", CHILD, method, route, body, "1" if lifespan else "0"],
+        cwd=app_dir, env=env, capture_output=True, text=True, check=True,
+    )
+    total_ms = (time.perf_counter() - start) * 1000
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result["process_total_ms"] = total_ms
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start time-to-first-response benchmark")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--route", default="/simulate")
+    parser.add_argument("--app-dir", default=os.path.dirname(os.path.abspath(__file__)))
+    parser.add_argument("--port", type=int, default=8003)
+    parser.add_argument("--lifespan", action="store_true", help="run the app's startup hook before the request, as a server would")
+    parser.add_argument("--json", action="store_true", help="print one JSON summary line")
+    args = parser.parse_args()
+
+    server = make_server(port=args.port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    # No snapshot exists in the scratch directory, so every run starts from the committed seed.
+    scratch = tempfile.mkdtemp(prefix="cold-start-")
+    stats_path = os.path.join(scratch, "model_stats.json")
+    env = dict(
+        os.environ,
+        OPENWEATHERMAP_BASE_URL=f"http://127.0.0.1:{args.port}",
+        OPENWEATHERMAP_API_KEY="cold-start-bench",
+        MODEL_STATS_PATH=stats_path,
+        MODEL_STATS_SNAPSHOT_EVERY="0",
+    )
+    method, body = ("POST", json.dumps({"surface_area": 120.0, "location": "Dubai"})) if args.route.startswith("/simulate") else ("GET", "")
+
+    run_once(args.app_dir, env, method, args.route, body, args.lifespan)  # warm the OS file cache and .pyc files
+    runs = [run_once(args.app_dir, env, method, args.route, body, args.lifespan) for _ in range(args.runs)]
+    server.shutdown()
+    shutil.rmtree(scratch, ignore_errors=True)
+
+    summary = {
+        "route": args.route,
+        "runs": args.runs,
+        "lifespan": args.lifespan,
+        "status": runs[-1]["status"],
+        "import_ms_median": round(statistics.median(r["import_ms"] for r in runs), 1),
+        "startup_ms_median": round(statistics.median(r["startup_ms"] for r in runs), 1),
+        "first_response_ms_median": round(statistics.median(r["first_response_ms"] for r in runs), 1),
+        "time_to_first_response_ms_median": round(statistics.median(r["import_ms"] + r["startup_ms"] + r["first_response_ms"] for r in runs), 1),
+        "process_total_ms_median": round(statistics.median(r["process_total_ms"] for r in runs), 1),
+        "loaded_at_import": runs[-1]["loaded_at_import"],
+        "loaded_after_response": runs[-1]["loaded_after_response"],
+    }
+    if args.json:
+        print(json.dumps(summary))
+        return
+    print(f"Cold start, {method} {args.route}, {args.runs} fresh interpreters{' with lifespan' if args.lifespan else ''} (status {summary['status']})")
+    for key in ("import_ms_median", "startup_ms_median", "first_response_ms_median", "time_to_first_response_ms_median", "process_total_ms_median"):
+        print(f"  {key:<36}{summary[key]:>10.1f}")
+    print(f"  heavy modules loaded by import:     {', '.join(summary['loaded_at_import']) or '-'}")
+    print(f"  heavy modules loaded after request: {', '.join(summary['loaded_after_response']) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
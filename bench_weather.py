@@ -0,0 +1,83 @@
+"""
+Load benchmark for the weather upstream path against a local stub server.
+
+Compares the old pattern (a new httpx.AsyncClient per lookup) with the shared
+pooled WeatherClient and prints p50/p99 latency for each. The weather cache is
+bypassed on purpose so every lookup reaches the stub.
+
+Usage:
+    python bench_weather.py --requests 2000 --concurrency 50 --latency-ms 5
+"""
+import argparse
+import asyncio
+import statistics
+import threading
+import time
+
+import httpx
+
+from fake_weather_server import make_server
+from weather_client import WeatherClient
+
+
+def percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def run_load(fetch, total: int, concurrency: int) -> list:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i: int):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await fetch({"q": f"City {i % 200}", "appid": "bench", "units": "metric"})
+            latencies.append((time.perf_counter() - start) * 1000)
+            assert response.status_code == 200, response.status_code
+
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return latencies
+
+
+async def main(args):
+    server = make_server(port=args.port, latency_ms=args.latency_ms)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{args.port}/data/2.5/weather"
+
+    async def fetch_per_request_client(params):
+        async with httpx.AsyncClient() as client:
+            return await client.get(url, params=params)
+
+    shared = WeatherClient(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    await shared.start()
+
+    async def fetch_shared_client(params):
+        return await shared.get(url, params=params)
+
+    results = {}
+    for name, fetch in (("before: client per request", fetch_per_request_client), ("after: shared pooled client", fetch_shared_client)):
+        await run_load(fetch, min(100, args.requests), args.concurrency)  # warm-up
+        start = time.perf_counter()
+        latencies = await run_load(fetch, args.requests, args.concurrency)
+        elapsed = time.perf_counter() - start
+        results[name] = (latencies, elapsed)
+
+    await shared.close()
+    server.shutdown()
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}, stub latency {args.latency_ms} ms")
+    print(f"{'mode':<30}{'p50 ms':>10}{'p99 ms':>10}{'mean ms':>10}{'req/s':>10}")
+    for name, (latencies, elapsed) in results.items():
+        print(f"{name:<30}{percentile(latencies, 50):>10.2f}{percentile(latencies, 99):>10.2f}"
+              f"{statistics.mean(latencies):>10.2f}{len(latencies) / elapsed:>10.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Weather upstream client benchmark")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--port", type=int, default=8002)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,85 @@
+"""
+Streaming NDJSON bulk simulation.
+
+Input is read incrementally as byte chunks, split into NDJSON records and
+processed in fixed-size chunks; results are yielded as NDJSON lines as soon as
+each chunk is done. Only one chunk of records is held in memory at a time, so
+peak memory does not grow with the size of the inventory.
+"""
+import json
+from typing import AsyncIterator, Awaitable, Callable, List, Tuple
+
+DEFAULT_CHUNK_SIZE = 1000
+DEFAULT_MAX_LINE_BYTES = 64 * 1024
+
+ChunkProcessor = Callable[[list], Awaitable[list]]
+
+
+class LineTooLongError(ValueError):
+    pass
+
+
+async def iter_ndjson_lines(byte_chunks: AsyncIterator[bytes], max_line_bytes: int = DEFAULT_MAX_LINE_BYTES) -> AsyncIterator[bytes]:
+    buffer = b""
+    async for chunk in byte_chunks:
+        buffer += chunk
+        lines = buffer.split(b"\n")
+        buffer = lines.pop()
+        if len(buffer) > max_line_bytes:
+            raise LineTooLongError(f"NDJSON line exceeds {max_line_bytes} bytes.")
+        for line in lines:
+            if line.strip():
+                yield line
+    if buffer.strip():
+        yield buffer
+
+
+async def iter_chunks(lines: AsyncIterator[bytes], chunk_size: int) -> AsyncIterator[List[Tuple[int, object]]]:
+    """
+    Groups records into lists of (index, parsed record). Lines that are not
+    valid JSON are passed through as a ValueError so they can be reported in place.
+    """
+    chunk = []
+    index = 0
+    async for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            record = ValueError(f"Invalid JSON: {exc}")
+        chunk.append((index, record))
+        index += 1
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+async def stream_simulations(
+    byte_chunks: AsyncIterator[bytes],
+    process_chunk: ChunkProcessor,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    max_line_bytes: int = DEFAULT_MAX_LINE_BYTES,
+) -> AsyncIterator[bytes]:
+    """
+    Yields one NDJSON result line per input record, in input order. "index" is
+    the record's position in the stream (blank lines are not counted).
+    """
+    try:
+        async for chunk in iter_chunks(iter_ndjson_lines(byte_chunks, max_line_bytes), chunk_size):
+            results: list = [None] * len(chunk)
+            parsed = []
+            for position, (index, record) in enumerate(chunk):
+                if isinstance(record, ValueError):
+                    results[position] = {"index": index, "error": {"status_code": 400, "detail": str(record)}}
+                else:
+                    parsed.append((position, record))
+
+            processed = await process_chunk([record for _, record in parsed])
+            for (position, _), result in zip(parsed, processed):
+                results[position] = {**result, "index": chunk[position][0]}
+
+            yield "".join(json.dumps(result) + "\n" for result in results).encode("utf-8")
+    except LineTooLongError as exc:
+        # Headers are already sent, so the failure is reported as a final record.
+        yield (json.dumps({"error": {"status_code": 413, "detail": str(exc)}}) + "\n").encode("utf-8")
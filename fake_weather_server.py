@@ -0,0 +1,125 @@
+"""
+Local stand-in for the OpenWeatherMap API, for testing and benchmarks.
+
+Usage:
+    python fake_weather_server.py --port 8001 --latency-ms 50
+    OPENWEATHERMAP_BASE_URL=http://127.0.0.1:8001 OPENWEATHERMAP_API_KEY=fake uvicorn main:app
+
+Readings are derived from the city name, so the same city always gets the same
+weather. GET /__stats reports how many upstream calls were actually made.
+"""
+import argparse
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def reading_for(city: str) -> dict:
+    digest = hashlib.sha256(" ".join(city.split()).casefold().encode("utf-8")).digest()
+    humidity = 20 + digest[0] % 76      # 20..95 %
+    temperature = -5 + digest[1] % 41   # -5..35 C
+    return {"humidity": humidity, "temp": float(temperature)}
+
+
+def forecast_for(city: str, points: int = 40) -> list:
+    """5 days of 3-hourly readings swinging around the current reading on a daily cycle."""
+    base = reading_for(city)
+    start = int(time.time()) // 10800 * 10800
+    forecast = []
+    for i in range(points):
+        phase = math.sin(2 * math.pi * (i % 8) / 8)
+        forecast.append({
+            "dt": start + i * 10800,
+            "main": {
+                "humidity": max(0, min(100, round(base["humidity"] - 15 * phase + (i // 8) * 2))),
+                "temp": round(base["temp"] + 6 * phase, 2),
+            },
+        })
+    return forecast
+
+
+class FakeWeatherHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients can keep connections alive between calls.
+    protocol_version = "HTTP/1.1"
+    latency_seconds = 0.0
+    fail_rate = 0.0
+    stats = {"requests": 0, "by_city": {}}
+    stats_lock = threading.Lock()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+
+        if url.path == "/__stats":
+            with self.stats_lock:
+                self._send_json(200, self.stats)
+            return
+        if url.path not in ("/data/2.5/weather", "/data/2.5/forecast"):
+            self._send_json(404, {"cod": "404", "message": "not found"})
+            return
+
+        city = query.get("q", [""])[0]
+        with self.stats_lock:
+            self.stats["requests"] += 1
+            self.stats["by_city"][city] = self.stats["by_city"].get(city, 0) + 1
+
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        if not query.get("appid"):
+            self._send_json(401, {"cod": 401, "message": "Invalid API key."})
+            return
+        if not city or city.casefold().startswith("nowhere"):
+            self._send_json(404, {"cod": "404", "message": "city not found"})
+            return
+        if self.fail_rate and random.random() < self.fail_rate:
+            self._send_json(503, {"cod": 503, "message": "service unavailable"})
+            return
+
+        if url.path == "/data/2.5/forecast":
+            self._send_json(200, {"city": {"name": city}, "list": forecast_for(city)})
+            return
+        self._send_json(200, {"name": city, "dt": int(time.time()), "main": reading_for(city)})
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(host: str = "127.0.0.1", port: int = 8001, latency_ms: float = 0.0, fail_rate: float = 0.0) -> ThreadingHTTPServer:
+    handler = type("ConfiguredFakeWeatherHandler", (FakeWeatherHandler,), {
+        "latency_seconds": latency_ms / 1000.0,
+        "fail_rate": fail_rate,
+        "stats": {"requests": 0, "by_city": {}},
+        "stats_lock": threading.Lock(),
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake OpenWeatherMap server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.latency_ms, args.fail_rate)
+    print(f"Fake weather server listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,147 @@
+"""
+Time-resolved multi-day yield simulation.
+
+Weather comes in as hourly series, one list of 24 values per day, either
+parsed from the OpenWeatherMap 5-day/3-hour forecast or loaded from a local
+fixture file. Yield is integrated hour by hour.
+
+Like simulation.py, this module serves single /simulate calls and avoids
+NumPy so the single-request path stays cheap to import; forecast_batch.py
+has a vectorized many-façade version for library use.
+"""
+import json
+from bisect import bisect_right
+from math import ceil, fsum
+from typing import List, Optional
+
+from simulation import DEFAULT_FACADE_PARAMETERS, FacadeParameters
+from weather_cache import WeatherCache
+
+HOURS_PER_DAY = 24
+SECONDS_PER_HOUR = 3600
+SECONDS_PER_DAY = HOURS_PER_DAY * SECONDS_PER_HOUR
+
+Series = List[List[float]]
+
+
+def simulate_daily_yield(
+    surface_area: float,
+    relative_humidity: Series,
+    temperature_celsius: Series,
+    params: FacadeParameters = DEFAULT_FACADE_PARAMETERS,
+) -> List[float]:
+    """
+    Integrates hourly yield for one façade and returns liters per day.
+
+    The baseline yield is a daily rate, so each hour contributes 1/24 of the
+    rate at that hour's humidity and temperature. With constant weather and
+    default parameters a day matches calculate_water_harvest before rounding.
+    """
+    if len(relative_humidity) != len(temperature_celsius) or any(
+        len(humidity) != HOURS_PER_DAY or len(temperature) != HOURS_PER_DAY
+        for humidity, temperature in zip(relative_humidity, temperature_celsius)
+    ):
+        raise ValueError("Weather series must both be shaped (days, 24).")
+    daily_rate = max(surface_area, 0.0) * params.baseline_yield_per_sq_meter
+    yields = []
+    for humidity, temperature in zip(relative_humidity, temperature_celsius):
+        humidity = [max(h, 0.0) for h in humidity]
+        if params.temperature_coefficient:
+            humidity_hours = fsum([
+                h / params.baseline_humidity * max(1.0 + params.temperature_coefficient * (t - params.reference_temperature_celsius), 0.0)
+                for h, t in zip(humidity, temperature)
+            ])
+        else:
+            humidity_hours = fsum(humidity) / params.baseline_humidity
+        yields.append(daily_rate * humidity_hours / HOURS_PER_DAY)
+    return yields
+
+
+def forecast_yield(surface_area: float, series: dict, params: FacadeParameters = DEFAULT_FACADE_PARAMETERS) -> List[float]:
+    """Daily yields for one façade, rounded like the rest of the API."""
+    return [round(value, 2) for value in simulate_daily_yield(surface_area, series["relative_humidity"], series["temperature_celsius"], params)]
+
+
+def constant_series(relative_humidity: float, temperature_celsius: float, days: int) -> dict:
+    return {
+        "relative_humidity": [[float(relative_humidity)] * HOURS_PER_DAY for _ in range(days)],
+        "temperature_celsius": [[float(temperature_celsius)] * HOURS_PER_DAY for _ in range(days)],
+        "source": "current",
+    }
+
+
+def _interp(x: float, xp: List[float], fp: List[float]) -> float:
+    """Linear interpolation with np.interp's arithmetic and end clamping, for sorted xp."""
+    if x <= xp[0]:
+        return fp[0]
+    if x >= xp[-1]:
+        return fp[-1]
+    j = bisect_right(xp, x) - 1
+    slope = (fp[j + 1] - fp[j]) / (xp[j + 1] - xp[j])
+    return slope * (x - xp[j]) + fp[j]
+
+
+def _split_days(values: List[float]) -> Series:
+    return [values[start:start + HOURS_PER_DAY] for start in range(0, len(values), HOURS_PER_DAY)]
+
+
+def parse_owm_forecast(data: dict, days: int) -> dict:
+    """
+    Resamples an OpenWeatherMap 3-hourly forecast to hourly (days, 24) series.
+    The free forecast covers about 5 days; later days repeat the last covered
+    day's hourly profile.
+    """
+    points = sorted(data["list"], key=lambda point: point["dt"])
+    if not points:
+        raise ValueError("Forecast contains no data points.")
+    timestamps = [float(point["dt"]) for point in points]
+    humidity = [float(point["main"]["humidity"]) / 100 for point in points]
+    temperature = [float(point["main"]["temp"]) for point in points]
+
+    hours = []
+    for step in range(days * HOURS_PER_DAY):
+        hour = timestamps[0] + SECONDS_PER_HOUR * step
+        if hour > timestamps[-1]:
+            hour -= ceil((hour - timestamps[-1]) / SECONDS_PER_DAY) * SECONDS_PER_DAY
+        hours.append(hour)
+    return {
+        "relative_humidity": _split_days([_interp(hour, timestamps, humidity) for hour in hours]),
+        "temperature_celsius": _split_days([_interp(hour, timestamps, temperature) for hour in hours]),
+        "source": "forecast",
+    }
+
+
+class ForecastFixture:
+    """
+    Hourly series from a local JSON file, for offline runs and reproducible tests:
+
+        {"dubai": {"relative_humidity": [[...24 values...], ...],
+                   "temperature_celsius": [[...], ...]},
+         "*": {...}}
+
+    Keys are matched on the normalized city name; "*" is used for any other city.
+    """
+
+    def __init__(self, path: str):
+        with open(path) as f:
+            raw = json.load(f)
+        self._series = {
+            (key if key == "*" else WeatherCache.normalize_key(key)): {
+                "relative_humidity": [[float(value) for value in day] for day in entry["relative_humidity"]],
+                "temperature_celsius": [[float(value) for value in day] for day in entry["temperature_celsius"]],
+                "source": "fixture",
+            }
+            for key, entry in raw.items()
+        }
+
+    def get(self, city: str, days: int) -> Optional[dict]:
+        series = self._series.get(WeatherCache.normalize_key(city), self._series.get("*"))
+        if series is None:
+            return None
+        available = len(series["relative_humidity"])
+        # Cycle the fixture's days if it is shorter than the requested horizon.
+        return {
+            "relative_humidity": [series["relative_humidity"][day % available] for day in range(days)],
+            "temperature_celsius": [series["temperature_celsius"][day % available] for day in range(days)],
+            "source": "fixture",
+        }
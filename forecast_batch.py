@@ -0,0 +1,65 @@
+"""
+Vectorized forecast integration for many façades at once.
+
+simulate_daily_yields applies the same hourly integration as
+forecast.simulate_daily_yield to whole NumPy arrays, shaped (facades, days);
+the hourly sums are not computed in the same order, so the two can differ in
+the last bit. Series from forecast.py (nested lists) are accepted as they are.
+Library-only: /simulate uses forecast.py, and no endpoint calls this module.
+"""
+from typing import Sequence, Union
+
+import numpy as np
+
+from forecast import HOURS_PER_DAY
+from simulation import DEFAULT_FACADE_PARAMETERS, FacadeParameters
+from simulation_batch import round_2dp
+
+ParameterInput = Union[FacadeParameters, Sequence[FacadeParameters]]
+
+
+def stack_parameters(params: ParameterInput, facade_count: int) -> dict:
+    """Turns one FacadeParameters (shared) or one per façade into (facades, 1, 1) arrays."""
+    if isinstance(params, FacadeParameters):
+        params = [params]
+    elif len(params) != facade_count:
+        raise ValueError(f"Expected 1 or {facade_count} parameter sets, got {len(params)}.")
+    return {
+        field: np.array([getattr(p, field) for p in params], dtype=np.float64).reshape(-1, 1, 1)
+        for field in FacadeParameters.__dataclass_fields__
+    }
+
+
+def simulate_daily_yields(
+    surface_areas: np.ndarray,
+    relative_humidity: np.ndarray,
+    temperature_celsius: np.ndarray,
+    params: ParameterInput = DEFAULT_FACADE_PARAMETERS,
+) -> np.ndarray:
+    """
+    Integrates hourly yield and returns liters per day, shaped (facades, days).
+
+    The baseline yield is a daily rate, so each hour contributes 1/24 of the
+    rate at that hour's humidity and temperature. With constant weather and
+    default parameters a day matches calculate_water_harvest before rounding.
+    """
+    surface_areas = np.asarray(surface_areas, dtype=np.float64).reshape(-1, 1)
+    humidity = np.clip(np.asarray(relative_humidity, dtype=np.float64), 0.0, None)[np.newaxis]
+    temperature = np.asarray(temperature_celsius, dtype=np.float64)[np.newaxis]
+    if humidity.shape[-1] != HOURS_PER_DAY or humidity.shape != temperature.shape:
+        raise ValueError("Weather series must both be shaped (days, 24).")
+    p = stack_parameters(params, surface_areas.shape[0])
+
+    if np.any(p["temperature_coefficient"]):
+        temperature_factor = np.clip(1.0 + p["temperature_coefficient"] * (temperature - p["reference_temperature_celsius"]), 0.0, None)
+        humidity_hours = (humidity / p["baseline_humidity"] * temperature_factor).sum(axis=-1)
+    else:
+        # No temperature term: the hourly sum is shared by every façade, so skip the (facades, days, 24) array.
+        humidity_hours = humidity.sum(axis=-1) / p["baseline_humidity"][:, :, 0]
+    daily_rate = np.clip(surface_areas, 0.0, None) * p["baseline_yield_per_sq_meter"][:, :, 0]
+    return daily_rate * humidity_hours / HOURS_PER_DAY
+
+
+def forecast_yields(surface_areas, series: dict, params: ParameterInput = DEFAULT_FACADE_PARAMETERS) -> np.ndarray:
+    """Daily yields rounded like the rest of the API, shaped (facades, days)."""
+    return round_2dp(simulate_daily_yields(surface_areas, series["relative_humidity"], series["temperature_celsius"], params))
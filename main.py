@@ -1,101 +1,606 @@
+import asyncio
+import hashlib
+import logging
+import math
 import os
-import httpx
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, Field
-from dotenv import load_dotenv
+import tempfile
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Annotated, Any, List, Optional
+
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
+
+from bulk import stream_simulations
+from metrics import MetricsMiddleware, MetricsRegistry, SamplingProfiler
+from online_stats import OnlineAnomalyModel, file_signature, write_json_atomic
+from simulation import MAX_SANE_SURFACE_AREA, calculate_water_harvest, get_anomaly_info
+from weather_cache import WeatherCache
+from weather_client import CircuitBreaker, CircuitOpenError, RetryBudget, UpstreamConnectionError, UpstreamTimeoutError, WeatherClient
+
+# Cold start matters on serverless: numpy (batch, sweep) and httpx (first
+# upstream call) are imported where they are first needed, not here. A single
+# /simulate never imports numpy; its forecast runs in pure Python.
 
 # --- Load Environment Variables ---
-load_dotenv()
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# python-dotenv is only imported when there is a .env to read; deployments inject env vars directly.
+if os.path.exists(".env") or os.path.exists(os.path.join(BASE_DIR, ".env")):
+    from dotenv import load_dotenv
+    load_dotenv()
 OPENWEATHERMAP_API_KEY = os.getenv("OPENWEATHERMAP_API_KEY")
+# Point this at a local fake (see fake_weather_server.py) for testing and benchmarks.
+OPENWEATHERMAP_BASE_URL = os.getenv("OPENWEATHERMAP_BASE_URL", "https://api.openweathermap.org").rstrip("/")
+WEATHER_CACHE_TTL_SECONDS = float(os.getenv("WEATHER_CACHE_TTL_SECONDS", "300"))
+WEATHER_CACHE_STALE_SECONDS = float(os.getenv("WEATHER_CACHE_STALE_SECONDS", "600"))
+WEATHER_CACHE_MAX_ENTRIES = int(os.getenv("WEATHER_CACHE_MAX_ENTRIES", "1024"))
+WEATHER_HTTP_MAX_CONNECTIONS = int(os.getenv("WEATHER_HTTP_MAX_CONNECTIONS", "100"))
+WEATHER_HTTP_MAX_KEEPALIVE = int(os.getenv("WEATHER_HTTP_MAX_KEEPALIVE", "20"))
+WEATHER_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("WEATHER_HTTP_KEEPALIVE_EXPIRY", "30"))
+WEATHER_HTTP_CONNECT_TIMEOUT = float(os.getenv("WEATHER_HTTP_CONNECT_TIMEOUT", "3"))
+WEATHER_HTTP_READ_TIMEOUT = float(os.getenv("WEATHER_HTTP_READ_TIMEOUT", "5"))
+WEATHER_HTTP_MAX_RETRIES = int(os.getenv("WEATHER_HTTP_MAX_RETRIES", "2"))
+WEATHER_HTTP_RETRY_BACKOFF = float(os.getenv("WEATHER_HTTP_RETRY_BACKOFF", "0.1"))
+WEATHER_HTTP_RETRY_BUDGET_RATIO = float(os.getenv("WEATHER_HTTP_RETRY_BUDGET_RATIO", "0.2"))
+WEATHER_BREAKER_FAILURE_THRESHOLD = int(os.getenv("WEATHER_BREAKER_FAILURE_THRESHOLD", "5"))
+WEATHER_BREAKER_RESET_SECONDS = float(os.getenv("WEATHER_BREAKER_RESET_SECONDS", "30"))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "10000"))
+BATCH_WEATHER_CONCURRENCY = int(os.getenv("BATCH_WEATHER_CONCURRENCY", "8"))
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "1000"))
+FORECAST_DAYS = int(os.getenv("FORECAST_DAYS", "7"))
+FORECAST_CACHE_TTL_SECONDS = float(os.getenv("FORECAST_CACHE_TTL_SECONDS", "1800"))
+# A failed forecast lookup falls back to constant weather; the fallback is reused for this long before retrying.
+FORECAST_FAILURE_TTL_SECONDS = float(os.getenv("FORECAST_FAILURE_TTL_SECONDS", "60"))
+FORECAST_HTTP_MAX_RETRIES = int(os.getenv("FORECAST_HTTP_MAX_RETRIES", "0"))
+SWEEP_MAX_POINTS = int(os.getenv("SWEEP_MAX_POINTS", "250000"))
+# The committed model_stats.json is a read-only seed (written by train_model.py). Runtime
+# snapshots go to MODEL_STATS_PATH, outside the source tree, and are loaded in preference to the seed.
+MODEL_STATS_SEED_PATH = os.path.join(BASE_DIR, "model_stats.json")
+MODEL_STATS_PATH = os.getenv("MODEL_STATS_PATH", os.path.join(tempfile.gettempdir(), "watergrid_model_stats.json"))
+# Snapshot the online statistics after this many updates (and on shutdown); 0 disables writes.
+MODEL_STATS_SNAPSHOT_EVERY = int(os.getenv("MODEL_STATS_SNAPSHOT_EVERY", "500"))
+ANOMALY_Z_THRESHOLD = float(os.getenv("ANOMALY_Z_THRESHOLD", "4.0"))
+ANOMALY_MIN_LOCATION_SAMPLES = int(os.getenv("ANOMALY_MIN_LOCATION_SAMPLES", "30"))
+# Fraction of requests to run under cProfile (see GET /metrics/profile); 0 disables the profiler
+# and the endpoint, which exposes code paths and timings.
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_REPORT_MAX_LINES = 200
+# Optional local hourly series (see forecast.ForecastFixture) used instead of the upstream forecast.
+FORECAST_FIXTURE_PATH = os.getenv("FORECAST_FIXTURE_PATH")
+# Long-running servers pay the lazy imports during startup instead of on the first request.
+WARM_UP_ON_STARTUP = os.getenv("WARM_UP_ON_STARTUP", "1") == "1"
 
 # --- Pydantic Models (Unchanged) ---
 class SimulationInput(BaseModel):
     surface_area: float = Field(..., gt=0)
     location: str = Field(..., min_length=2)
 
-# --- Core Logic (Unchanged) ---
-def calculate_water_harvest(surface_area: float, relative_humidity: float) -> float:
-    BASELINE_YIELD_PER_SQ_METER = 1.11
-    BASELINE_HUMIDITY = 0.20
-    if relative_humidity <= 0 or surface_area <= 0: return 0.0
-    humidity_factor = relative_humidity / BASELINE_HUMIDITY
-    estimated_yield = surface_area * BASELINE_YIELD_PER_SQ_METER * humidity_factor
-    return round(estimated_yield, 2)
+# NaN/inf (which json.loads accepts) and out-of-range values would break the grid
+# lookup or overflow to inf in the response, so they are rejected with a 422.
+SweepArea = Annotated[float, Field(ge=0, le=MAX_SANE_SURFACE_AREA, allow_inf_nan=False)]
+SweepHumidity = Annotated[float, Field(ge=0, le=1, allow_inf_nan=False)]
 
-async def get_weather_data(city: str) -> dict:
+class SweepInput(BaseModel):
+    surface_areas: List[SweepArea]
+    relative_humidities: List[SweepHumidity]
+    # Defaults to the live temperature for `location` if given, otherwise 20 C.
+    temperature_celsius: Optional[float] = Field(None, ge=-100, le=100, allow_inf_nan=False)
+    location: Optional[str] = None
+
+class BatchSimulationInput(BaseModel):
+    # Items are validated one by one so a bad row becomes a per-item error, not a 422 for the whole batch.
+    items: List[Any]
+
+# Output models for the compact response mode. Every value is produced by the
+# pipeline from validated input, so they are built with model_construct() and
+# serialized straight to JSON by pydantic-core, skipping validation and jsonable_encoder.
+class WeatherSnapshot(BaseModel):
+    relative_humidity: float
+    temperature_celsius: float
+
+class CompactSimulationResult(BaseModel):
+    location: str
+    estimated_yield_liters_per_day: float
+    live_weather_data: WeatherSnapshot
+    forecast_7_day: List[float]
+    anomaly_flag: bool
+    statistical_anomaly_flag: bool
+
+# --- Metrics ---
+metrics = MetricsRegistry()
+metrics.describe("watergrid_stage_duration_seconds", "histogram", "Time spent in each stage of the simulate pipeline.")
+metrics.describe("watergrid_request_duration_seconds", "histogram", "HTTP request latency by route.")
+metrics.describe("watergrid_requests_in_flight", "gauge", "HTTP requests currently being served.")
+metrics.describe("watergrid_upstream_request_duration_seconds", "histogram", "Weather upstream call latency, including retries.")
+metrics.describe("watergrid_upstream_responses_total", "counter", "Weather upstream outcomes by HTTP status code or error kind.")
+metrics.describe("watergrid_upstream_circuit_open", "gauge", "1 while the circuit breaker for an upstream (weather or forecast) is open.")
+metrics.describe("watergrid_weather_cache_events_total", "counter", "Weather cache lookups by outcome.")
+metrics.describe("watergrid_weather_cache_entries", "gauge", "Cities currently held in the weather cache.")
+profiler = SamplingProfiler(PROFILE_SAMPLE_RATE)
+
+def stage_timer(stage: str, pipeline: str = "simulate"):
+    return metrics.timer("watergrid_stage_duration_seconds", stage=stage, pipeline=pipeline)
+
+# --- Shared Upstream Client ---
+# One pooled client for the whole process; opened and closed by the app lifespan below.
+weather_client = WeatherClient(
+    max_connections=WEATHER_HTTP_MAX_CONNECTIONS,
+    max_keepalive_connections=WEATHER_HTTP_MAX_KEEPALIVE,
+    keepalive_expiry=WEATHER_HTTP_KEEPALIVE_EXPIRY,
+    connect_timeout=WEATHER_HTTP_CONNECT_TIMEOUT,
+    read_timeout=WEATHER_HTTP_READ_TIMEOUT,
+    max_retries=WEATHER_HTTP_MAX_RETRIES,
+    retry_backoff_seconds=WEATHER_HTTP_RETRY_BACKOFF,
+    retry_budget=RetryBudget(ratio=WEATHER_HTTP_RETRY_BUDGET_RATIO),
+    breaker=CircuitBreaker(
+        failure_threshold=WEATHER_BREAKER_FAILURE_THRESHOLD,
+        reset_seconds=WEATHER_BREAKER_RESET_SECONDS,
+    ),
+)
+
+# The forecast is best effort (there is a fallback), so it gets its own breaker: a
+# forecast outage must not open the circuit for current-weather lookups.
+forecast_breaker = CircuitBreaker(
+    failure_threshold=WEATHER_BREAKER_FAILURE_THRESHOLD,
+    reset_seconds=WEATHER_BREAKER_RESET_SECONDS,
+)
+
+async def request_openweathermap(path: str, city: str, breaker: Optional[CircuitBreaker] = None, max_retries: Optional[int] = None) -> dict:
     if not OPENWEATHERMAP_API_KEY: raise HTTPException(status_code=500, detail="OpenWeatherMap API key is not configured.")
-    api_url = f"https://api.openweathermap.org/data/2.5/weather?q={city}&appid={OPENWEATHERMAP_API_KEY}&units=metric"
-    async with httpx.AsyncClient() as client:
-        response = await client.get(api_url)
+    api_url = f"{OPENWEATHERMAP_BASE_URL}{path}"
+    params = {"q": city, "appid": OPENWEATHERMAP_API_KEY, "units": "metric"}
+    outcome = "error"
+    try:
+        with metrics.timer("watergrid_upstream_request_duration_seconds", endpoint=path):
+            response = await weather_client.get(api_url, params=params, breaker=breaker, max_retries=max_retries)
+        outcome = str(response.status_code)
+    except CircuitOpenError:
+        outcome = "circuit_open"
+        raise HTTPException(status_code=503, detail="Weather service is temporarily unavailable.")
+    except UpstreamTimeoutError:
+        outcome = "timeout"
+        raise HTTPException(status_code=504, detail=f"Timed out fetching weather data for '{city}'.")
+    except UpstreamConnectionError:
+        outcome = "transport_error"
+        raise HTTPException(status_code=502, detail=f"Could not reach the weather service for '{city}'.")
+    finally:
+        metrics.inc("watergrid_upstream_responses_total", endpoint=path, status=outcome)
     if response.status_code != 200: raise HTTPException(status_code=response.status_code, detail=f"Error fetching weather data for '{city}'.")
-    data = response.json()
-    humidity = data["main"]["humidity"] / 100
-    temperature = data["main"]["temp"]
+    try:
+        return response.json()
+    except ValueError:
+        raise HTTPException(status_code=502, detail=f"Malformed weather data for '{city}'.")
+
+async def fetch_weather_data(city: str) -> dict:
+    data = await request_openweathermap("/data/2.5/weather", city)
+    # A malformed upstream body is the upstream's fault (502), and must stay a per-location
+    # HTTPException so batch and stream callers can report it per item.
+    try:
+        humidity = data["main"]["humidity"] / 100
+        temperature = data["main"]["temp"]
+    except (KeyError, TypeError):
+        raise HTTPException(status_code=502, detail=f"Malformed weather data for '{city}'.")
     return {"relative_humidity": humidity, "temperature_celsius": temperature}
 
-# --- NEW: Final, Correct, Rule-Based Anomaly Detection ---
-def get_anomaly_info(yield_value: float, surface_area: float) -> dict:
+# --- Weather Cache ---
+# Upstream errors are never cached; only successful lookups are stored.
+weather_cache = WeatherCache(
+    fetcher=fetch_weather_data,
+    ttl_seconds=WEATHER_CACHE_TTL_SECONDS,
+    stale_seconds=WEATHER_CACHE_STALE_SECONDS,
+    max_entries=WEATHER_CACHE_MAX_ENTRIES,
+)
+
+async def get_weather_data(city: str) -> dict:
+    return await weather_cache.get(city)
+
+# --- Hourly Forecast ---
+_forecast_fixture = None
+
+def get_forecast_fixture():
+    global _forecast_fixture
+    if _forecast_fixture is None and FORECAST_FIXTURE_PATH:
+        from forecast import ForecastFixture
+        _forecast_fixture = ForecastFixture(FORECAST_FIXTURE_PATH)
+    return _forecast_fixture
+
+async def fetch_forecast_series(city: str) -> dict:
+    from forecast import parse_owm_forecast
+    data = await request_openweathermap("/data/2.5/forecast", city, breaker=forecast_breaker, max_retries=FORECAST_HTTP_MAX_RETRIES)
+    # As in fetch_weather_data: any malformed body is a 502, so the caller's fallback covers it.
+    try:
+        return parse_owm_forecast(data, FORECAST_DAYS)
+    except (KeyError, TypeError, ValueError, IndexError):
+        raise HTTPException(status_code=502, detail=f"Malformed forecast data for '{city}'.")
+
+forecast_cache = WeatherCache(
+    fetcher=fetch_forecast_series,
+    ttl_seconds=FORECAST_CACHE_TTL_SECONDS,
+    stale_seconds=FORECAST_CACHE_TTL_SECONDS,
+    max_entries=WEATHER_CACHE_MAX_ENTRIES,
+)
+
+# Normalized city -> monotonic time of its last failed forecast lookup.
+_forecast_failed_at: "OrderedDict[str, float]" = OrderedDict()
+
+async def get_forecast_series(city: str) -> Optional[dict]:
     """
-    Checks if the result is anomalous based on two simple, robust rules.
-    Returns a dictionary with the flag and debug information.
+    Hourly (days, 24) humidity/temperature series for the forecast horizon, or
+    None if no forecast is available. The caller then holds today's conditions
+    constant, so a forecast outage never fails the simulation itself.
     """
-    # Rule 1: Check if the input surface area is nonsensical.
-    # 10,000,000 m^2 is 10 square kilometers, a generous upper limit for a single building facade.
-    MAX_SANE_SURFACE_AREA = 10_000_000.0
-    
-    is_area_anomaly = surface_area > MAX_SANE_SURFACE_AREA
-    
-    # Rule 2: Check if the yield per square meter is physically impossible.
-    # This catches data corruption errors (e.g., humidity > 100%).
-    yield_per_sq_meter = 0
-    if surface_area > 0:
-        yield_per_sq_meter = yield_value / surface_area
-        
-    MAX_PHYSICALLY_POSSIBLE_YIELD_PER_SQ_METER = 10.0
-    is_yield_anomaly = yield_per_sq_meter > MAX_PHYSICALLY_POSSIBLE_YIELD_PER_SQ_METER
-
-    # The final flag is true if EITHER rule is broken.
-    final_flag = is_area_anomaly or is_yield_anomaly
-
-    # This debug info will be sent to the frontend!
-    debug_info = {
-        "reasoning": "Anomaly is true if either the input area is too large or the yield per m^2 is physically impossible.",
-        "input_surface_area": surface_area,
-        "max_sane_surface_area": MAX_SANE_SURFACE_AREA,
-        "is_area_anomaly": is_area_anomaly,
-        "yield_per_sq_meter": round(yield_per_sq_meter, 2),
-        "max_yield_per_sq_meter": MAX_PHYSICALLY_POSSIBLE_YIELD_PER_SQ_METER,
-        "is_yield_anomaly": is_yield_anomaly,
-        "final_decision": final_flag
-    }
-    
-    return {"is_anomaly": final_flag, "debug_info": debug_info}
+    forecast_fixture = get_forecast_fixture()
+    if forecast_fixture is not None:
+        return forecast_fixture.get(city, FORECAST_DAYS)
+    key = WeatherCache.normalize_key(city)
+    failed_at = _forecast_failed_at.get(key)
+    if failed_at is not None and time.monotonic() - failed_at < FORECAST_FAILURE_TTL_SECONDS:
+        return None
+    try:
+        series = await forecast_cache.get(city)
+    except HTTPException:
+        _forecast_failed_at[key] = time.monotonic()
+        _forecast_failed_at.move_to_end(key)
+        while len(_forecast_failed_at) > WEATHER_CACHE_MAX_ENTRIES:
+            _forecast_failed_at.popitem(last=False)
+        return None
+    _forecast_failed_at.pop(key, None)
+    return series
+
+# --- Yield Grid ---
+# Loaded at startup or on first use: memory-mapped from yield_grid.npy, or rebuilt if
+# the model constants changed. A rebuild saves files, so it runs in a worker thread.
+_yield_grid = None
+_yield_grid_lock = asyncio.Lock()
+
+async def get_yield_grid():
+    global _yield_grid
+    async with _yield_grid_lock:
+        if _yield_grid is None:
+            from yield_grid import load_grid
+            _yield_grid = await asyncio.to_thread(load_grid)
+    return _yield_grid
+
+# --- Online Anomaly Statistics ---
+# Loaded once at startup; learns from served simulations without keeping history.
+# The model is per process: with several workers each learns separately and the last
+# snapshot written wins, so overwriting another process's snapshot is logged.
+logger = logging.getLogger("watergrid")
+
+anomaly_model = OnlineAnomalyModel.load(
+    MODEL_STATS_PATH if os.path.exists(MODEL_STATS_PATH) else MODEL_STATS_SEED_PATH,
+    z_threshold=ANOMALY_Z_THRESHOLD,
+    min_location_samples=ANOMALY_MIN_LOCATION_SAMPLES,
+)
+_snapshot_signature = file_signature(MODEL_STATS_PATH)
+
+def write_model_snapshot(data: dict) -> None:
+    global _snapshot_signature
+    if file_signature(MODEL_STATS_PATH) != _snapshot_signature:
+        logger.warning("%s was written by another process since this one loaded or saved it; overwriting it with this process's statistics.", MODEL_STATS_PATH)
+    write_json_atomic(MODEL_STATS_PATH, data)
+    _snapshot_signature = file_signature(MODEL_STATS_PATH)
+
+# Normalized city -> the cached weather reading it last learned from. Yield per m^2
+# depends only on the reading, so learning from every request (or every façade of a
+# batch) on one reading would make the statistics track traffic instead of weather.
+_learned_readings: "OrderedDict[str, dict]" = OrderedDict()
+
+def record_simulation(location: str, weather_data: dict, yield_per_sq_meter: float, is_rule_anomaly: bool, learn: bool = True) -> dict:
+    """
+    Scores the result against the statistics so far, then learns from it unless
+    a rule already rejected it or the caller (e.g. an offline CLI run) opted out.
+    """
+    score = anomaly_model.score(WeatherCache.normalize_key(location), yield_per_sq_meter)
+    if learn:
+        learn_simulation(location, weather_data, yield_per_sq_meter, is_rule_anomaly)
+    return score
+
+def learn_simulation(location: str, weather_data: dict, yield_per_sq_meter: float, is_rule_anomaly: bool) -> None:
+    """Adds one sample per (location, weather reading); later results on the same reading are skipped."""
+    key = WeatherCache.normalize_key(location)
+    # The cache hands out the same dict until it stores a new upstream reading.
+    if is_rule_anomaly or _learned_readings.get(key) is weather_data:
+        return
+    anomaly_model.update(key, yield_per_sq_meter)
+    _learned_readings[key] = weather_data
+    _learned_readings.move_to_end(key)
+    while len(_learned_readings) > WEATHER_CACHE_MAX_ENTRIES:
+        _learned_readings.popitem(last=False)
 
+async def snapshot_anomaly_model(force: bool = False) -> None:
+    if not MODEL_STATS_SNAPSHOT_EVERY or anomaly_model.updates_since_snapshot == 0:
+        return
+    if not force and anomaly_model.updates_since_snapshot < MODEL_STATS_SNAPSHOT_EVERY:
+        return
+    data = anomaly_model.to_dict()
+    anomaly_model.updates_since_snapshot = 0
+    try:
+        await asyncio.to_thread(write_model_snapshot, data)
+    except OSError:
+        # Read-only deployments keep learning in memory.
+        pass
+
+# --- Batch Simulation ---
+def describe_validation_error(exc: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in exc.errors())
+
+async def simulate_items(raw_items: list, learn: bool = False) -> list:
+    """
+    Runs the yield model and anomaly rules over many items at once.
+    Each distinct location is fetched once (at most BATCH_WEATHER_CONCURRENCY
+    at a time) and the math runs as NumPy array operations over the whole batch.
+    Returns one result per input item, in order; failed items carry an "error".
+    Results are scored against the anomaly statistics but only update them with
+    learn=True: a bulk upload should not retrain what single requests are scored on.
+    """
+    results: list = [None] * len(raw_items)
+    valid = []
+    for index, raw in enumerate(raw_items):
+        try:
+            valid.append((index, SimulationInput(**raw)))
+        except (ValidationError, TypeError) as exc:
+            detail = describe_validation_error(exc) if isinstance(exc, ValidationError) else "Item must be a JSON object."
+            results[index] = {"index": index, "error": {"status_code": 422, "detail": detail}}
+
+    locations = {}
+    for _, item in valid:
+        locations.setdefault(WeatherCache.normalize_key(item.location), item.location)
+
+    semaphore = asyncio.Semaphore(BATCH_WEATHER_CONCURRENCY)
+
+    async def fetch(city: str):
+        async with semaphore:
+            try:
+                return await get_weather_data(city)
+            except HTTPException as exc:
+                return exc
+
+    with stage_timer("weather_fetch", pipeline="batch"):
+        fetched = await asyncio.gather(*(fetch(city) for city in locations.values()))
+    weather_by_key = dict(zip(locations.keys(), fetched))
+
+    ready = []
+    for index, item in valid:
+        weather_data = weather_by_key[WeatherCache.normalize_key(item.location)]
+        if isinstance(weather_data, HTTPException):
+            results[index] = {"index": index, "error": {"status_code": weather_data.status_code, "detail": weather_data.detail}}
+        else:
+            ready.append((index, item, weather_data))
+
+    if ready:
+        import numpy as np
+        from simulation_batch import calculate_water_harvest_batch, get_anomaly_info_batch
+
+        surface_areas = np.array([item.surface_area for _, item, _ in ready], dtype=np.float64)
+        humidities = np.array([weather_data["relative_humidity"] for _, _, weather_data in ready], dtype=np.float64)
+        with stage_timer("yield", pipeline="batch"):
+            yields = calculate_water_harvest_batch(surface_areas, humidities)
+        with stage_timer("anomaly", pipeline="batch"):
+            anomalies = get_anomaly_info_batch(yields, surface_areas)
+        for position, (index, item, weather_data) in enumerate(ready):
+            score = record_simulation(item.location, weather_data, float(yields[position]) / item.surface_area, bool(anomalies["is_anomaly"][position]), learn)
+            results[index] = {
+                "index": index,
+                "location": item.location,
+                "surface_area": item.surface_area,
+                "live_weather_data": weather_data,
+                "estimated_yield_liters_per_day": float(yields[position]),
+                "yield_per_sq_meter": float(anomalies["yield_per_sq_meter"][position]),
+                "anomaly_flag": bool(anomalies["is_anomaly"][position]),
+                "statistical_anomaly_flag": score["is_statistical_anomaly"],
+            }
+        if learn:
+            await snapshot_anomaly_model()
+    return results
+
+
+class RequestStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse for bodies generated while the request is still being read.
+    The stock class listens for disconnects on receive() in parallel, which would
+    steal request body messages from request.stream(); here the body iterator is
+    the only reader, and a disconnect surfaces through it.
+    """
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+# --- Response Modes ---
+# Verbose (default) echoes the input and full debug_info. Compact is chosen with
+# ?compact=1 or this Accept type, and is the only mode sent with caching headers.
+COMPACT_MEDIA_TYPE = "application/vnd.watergrid.compact+json"
+
+def wants_compact(request: Request) -> bool:
+    flag = request.query_params.get("compact")
+    if flag is not None:
+        return flag.lower() in ("1", "true", "yes")
+    return COMPACT_MEDIA_TYPE in request.headers.get("accept", "")
+
+def compact_response(request: Request, result: CompactSimulationResult, cacheable: bool) -> Response:
+    """
+    Serializes the compact result and, for GET, attaches caching headers. The
+    ETag hashes the body itself, so it changes exactly when the weather snapshot
+    (or the anomaly verdict) does; max-age is what remains of that snapshot's freshness.
+    """
+    body = result.model_dump_json().encode()
+    etag = f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+    if_none_match = request.headers.get("if-none-match", "")
+    matched = etag in if_none_match or if_none_match.strip() == "*"
+    if request.method not in ("GET", "HEAD"):
+        # RFC 9110 13.1.2: a POST response is not reusable, and a matching
+        # If-None-Match on it is a failed precondition, not a 304.
+        headers = {"Cache-Control": "no-store"}
+        if matched:
+            return Response(status_code=412, headers=headers)
+    else:
+        max_age = int(weather_cache.fresh_for(result.location)) if cacheable else 0
+        headers = {
+            "ETag": etag,
+            # Forecast fallbacks and stale snapshots are still revalidated, just never reused blindly.
+            "Cache-Control": f"public, max-age={max_age}" if max_age else "no-cache",
+            "Vary": "Accept",
+        }
+        if matched:
+            return Response(status_code=304, headers=headers)
+    media_type = COMPACT_MEDIA_TYPE if COMPACT_MEDIA_TYPE in request.headers.get("accept", "") else "application/json"
+    return Response(content=body, media_type=media_type, headers=headers)
 
 # --- FastAPI Application ---
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await weather_client.start()
+    if WARM_UP_ON_STARTUP:
+        import forecast, simulation_batch  # noqa: F401 (simulation_batch pulls in numpy)
+        await get_yield_grid()
+    try:
+        yield
+    finally:
+        await weather_client.close()
+        await snapshot_anomaly_model(force=True)
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(
+    MetricsMiddleware,
+    registry=metrics,
+    profiler=profiler,
+    latency_metric="watergrid_request_duration_seconds",
+    in_flight_metric="watergrid_requests_in_flight",
+)
+
+@app.exception_handler(RequestValidationError)
+async def validation_error_handler(request: Request, exc: RequestValidationError):
+    # Same body as FastAPI's default, but a rejected NaN/inf input is echoed as a string:
+    # JSON cannot carry it, and the 422 would otherwise become a 500.
+    detail = jsonable_encoder(exc.errors(), custom_encoder={float: lambda value: value if math.isfinite(value) else str(value)})
+    return JSONResponse(status_code=422, content={"detail": detail})
+
+@app.get("/metrics")
+async def get_metrics():
+    cache_stats = weather_cache.stats()
+    for event in ("hits", "stale_hits", "misses", "coalesced", "refreshes", "refresh_errors", "evictions"):
+        metrics.set_counter("watergrid_weather_cache_events_total", cache_stats[event], event=event)
+    metrics.set_gauge("watergrid_weather_cache_entries", cache_stats["size"])
+    metrics.set_gauge("watergrid_upstream_circuit_open", 1 if weather_client.breaker.state == "open" else 0, upstream="weather")
+    metrics.set_gauge("watergrid_upstream_circuit_open", 1 if forecast_breaker.state == "open" else 0, upstream="forecast")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+async def get_profile(limit: int = Query(40, ge=1, le=PROFILE_REPORT_MAX_LINES), sort: str = "cumulative"):
+    if sort not in ("cumulative", "tottime", "ncalls"): raise HTTPException(status_code=422, detail="sort must be one of: cumulative, tottime, ncalls.")
+    return PlainTextResponse(profiler.report(limit=limit, sort_by=sort))
+
+if PROFILE_SAMPLE_RATE > 0:
+    app.add_api_route("/metrics/profile", get_profile, methods=["GET"])
+
+@app.get("/weather-cache/stats")
+async def get_weather_cache_stats():
+    return {**weather_cache.stats(), "upstream": {**weather_client.stats(), "forecast_circuit": forecast_breaker.stats()}}
 
 @app.post("/simulate")
-async def run_simulation(input_data: SimulationInput):
-    weather_data = await get_weather_data(input_data.location)
-    estimated_yield = calculate_water_harvest(
-        surface_area=input_data.surface_area,
-        relative_humidity=weather_data["relative_humidity"]
-    )
+async def run_simulation(input_data: SimulationInput, request: Request):
+    return await simulate_response(input_data, request)
+
+@app.get("/simulate")
+async def run_simulation_query(request: Request, surface_area: float = Query(..., gt=0), location: str = Query(..., min_length=2)):
+    # Same simulation as POST, but as a GET that browsers and CDNs can cache and revalidate.
+    return await simulate_response(SimulationInput(surface_area=surface_area, location=location), request)
+
+async def simulate_response(input_data: SimulationInput, request: Request) -> Response:
+    with stage_timer("weather_fetch"):
+        # Both lookups start together, so a cold city waits for one upstream round trip, not two.
+        weather_data, forecast_series = await asyncio.gather(
+            get_weather_data(input_data.location),
+            get_forecast_series(input_data.location),
+        )
+    with stage_timer("yield"):
+        estimated_yield = calculate_water_harvest(
+            surface_area=input_data.surface_area,
+            relative_humidity=weather_data["relative_humidity"]
+        )
     
     # Call the new, correct anomaly function
-    anomaly_result = get_anomaly_info(
-        yield_value=estimated_yield,
-        surface_area=input_data.surface_area
-    )
+    with stage_timer("anomaly"):
+        anomaly_result = get_anomaly_info(
+            yield_value=estimated_yield,
+            surface_area=input_data.surface_area
+        )
+        # Scored now, learned only once we know the response is not a 304 (see below).
+        statistical_result = record_simulation(
+            input_data.location,
+            weather_data,
+            estimated_yield / input_data.surface_area,
+            anomaly_result["is_anomaly"],
+            learn=False
+        )
 
-    forecast_data = [round(estimated_yield * v, 2) for v in [1.0, 1.05, 0.98, 1.10, 0.95, 1.02, 1.08]]
+    with stage_timer("forecast"):
+        from forecast import constant_series, forecast_yield
+        if forecast_series is None:
+            forecast_series = constant_series(weather_data["relative_humidity"], weather_data["temperature_celsius"], FORECAST_DAYS)
+        forecast_data = forecast_yield(input_data.surface_area, forecast_series)
     
+    # Built and serialized here (rather than by FastAPI after returning) so serialization is timed too.
+    with stage_timer("response_build"):
+        if wants_compact(request):
+            result = CompactSimulationResult.model_construct(
+                location=input_data.location,
+                estimated_yield_liters_per_day=estimated_yield,
+                live_weather_data=WeatherSnapshot.model_construct(**weather_data),
+                forecast_7_day=forecast_data,
+                anomaly_flag=anomaly_result["is_anomaly"],
+                statistical_anomaly_flag=statistical_result["is_statistical_anomaly"],
+            )
+            response = compact_response(request, result, cacheable=forecast_series["source"] != "current")
+        else:
+            response = JSONResponse(jsonable_encoder({
+                "input_parameters": input_data,
+                "live_weather_data": weather_data,
+                "estimated_yield_liters_per_day": estimated_yield,
+                "forecast_7_day": forecast_data,
+                "anomaly_flag": anomaly_result["is_anomaly"],
+                "statistical_anomaly_flag": statistical_result["is_statistical_anomaly"],
+                "debug_info": {**anomaly_result["debug_info"], **statistical_result} # We now return the debug info!
+            }))
+
+    # A 304 revalidates a result the client already has (and a 412 sends none);
+    # counting them would weight the statistics towards the most-polled cities.
+    if response.status_code == 200:
+        learn_simulation(input_data.location, weather_data, estimated_yield / input_data.surface_area, anomaly_result["is_anomaly"])
+        await snapshot_anomaly_model()
+    return response
+
+@app.post("/simulate/batch")
+async def run_batch_simulation(batch: BatchSimulationInput):
+    if not batch.items: raise HTTPException(status_code=422, detail="Batch must contain at least one item.")
+    if len(batch.items) > BATCH_MAX_ITEMS: raise HTTPException(status_code=413, detail=f"Batch is limited to {BATCH_MAX_ITEMS} items.")
+    results = await simulate_items(batch.items)
+    failed = sum(1 for result in results if "error" in result)
+    return {"results": results, "succeeded": len(results) - failed, "failed": failed}
+
+@app.post("/simulate/stream")
+async def run_stream_simulation(request: Request):
+    # Body is NDJSON SimulationInput records; results stream back as NDJSON in the same order.
+    results = stream_simulations(request.stream(), simulate_items, chunk_size=BULK_CHUNK_SIZE)
+    return RequestStreamingResponse(results, media_type="application/x-ndjson")
+
+@app.post("/simulate/sweep")
+async def run_sweep(sweep: SweepInput):
+    if not sweep.surface_areas or not sweep.relative_humidities: raise HTTPException(status_code=422, detail="Sweep axes must not be empty.")
+    if len(sweep.surface_areas) * len(sweep.relative_humidities) > SWEEP_MAX_POINTS: raise HTTPException(status_code=413, detail=f"Sweep is limited to {SWEEP_MAX_POINTS} points.")
+    temperature = sweep.temperature_celsius
+    if temperature is None:
+        temperature = (await get_weather_data(sweep.location))["temperature_celsius"] if sweep.location else 20.0
+    grid = (await get_yield_grid()).sweep(sweep.surface_areas, sweep.relative_humidities, temperature)
     return {
-        "input_parameters": input_data,
-        "live_weather_data": weather_data,
-        "estimated_yield_liters_per_day": estimated_yield,
-        "forecast_7_day": forecast_data,
-        "anomaly_flag": anomaly_result["is_anomaly"],
-        "debug_info": anomaly_result["debug_info"] # We now return the debug info!
-    }
\ No newline at end of file
+        "surface_areas": sweep.surface_areas,
+        "relative_humidities": sweep.relative_humidities,
+        "temperature_celsius": temperature,
+        # One row per humidity, one column per surface area.
+        "estimated_yield_liters_per_day": grid.tolist(),
+    }
@@ -0,0 +1,200 @@
+"""
+Low-overhead in-process metrics rendered in the Prometheus text format.
+
+Histograms use fixed buckets, so memory does not grow with traffic. Timing a
+stage costs two perf_counter() calls and a bisect.
+"""
+import bisect
+import io
+import random
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Tuple
+
+# Seconds; spans cache hits (microseconds) to slow upstream calls.
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._help: Dict[str, Tuple[str, str]] = {}
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._gauges: Dict[str, Dict[Labels, float]] = {}
+
+    def describe(self, name: str, kind: str, help_text: str) -> None:
+        self._help[name] = (kind, help_text)
+        {"histogram": self._histograms, "counter": self._counters, "gauge": self._gauges}[kind].setdefault(name, {})
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        series = self._histograms[name]
+        key = tuple(sorted(labels.items()))
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = Histogram()
+        histogram.observe(value)
+
+    def inc(self, name: str, amount: float = 1.0, **labels: str) -> None:
+        series = self._counters[name]
+        key = tuple(sorted(labels.items()))
+        series[key] = series.get(key, 0.0) + amount
+
+    def set_counter(self, name: str, value: float, **labels: str) -> None:
+        # For counts tracked elsewhere (e.g. cache counters) and copied in at scrape time.
+        self._counters[name][tuple(sorted(labels.items()))] = value
+
+    def set_gauge(self, name: str, value: float, **labels: str) -> None:
+        self._gauges[name][tuple(sorted(labels.items()))] = value
+
+    def add_gauge(self, name: str, amount: float, **labels: str) -> None:
+        series = self._gauges[name]
+        key = tuple(sorted(labels.items()))
+        series[key] = series.get(key, 0.0) + amount
+
+    @contextmanager
+    def timer(self, name: str, **labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def render(self) -> str:
+        lines = []
+        for name, (kind, help_text) in self._help.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "histogram":
+                for labels, histogram in self._histograms[name].items():
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_format_labels(labels, le=_format_value(bound))} {cumulative}")
+                    lines.append(f"{name}_bucket{_format_labels(labels, le='+Inf')} {histogram.count}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(histogram.sum)}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+            else:
+                series = self._counters[name] if kind == "counter" else self._gauges[name]
+                for labels, value in series.items():
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels: Labels, **extra: str) -> str:
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request latency per route, in-flight requests,
+    and (when sampled) a cProfile of the whole request. Plain ASGI rather than
+    BaseHTTPMiddleware so streaming request and response bodies pass through untouched.
+    """
+
+    def __init__(self, app, registry: MetricsRegistry, profiler: "SamplingProfiler", latency_metric: str, in_flight_metric: str):
+        self.app = app
+        self.registry = registry
+        self.profiler = profiler
+        self.latency_metric = latency_metric
+        self.in_flight_metric = in_flight_metric
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        profile = self.profiler.start() if self.profiler.should_sample() else None
+        self.registry.add_gauge(self.in_flight_metric, 1)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.registry.add_gauge(self.in_flight_metric, -1)
+            if profile is not None:
+                self.profiler.stop(profile)
+            # FastAPI puts the matched route in the scope; unmatched paths share one label to bound cardinality.
+            route = getattr(scope.get("route"), "path", "unmatched")
+            self.registry.observe(self.latency_metric, elapsed, route=route, method=scope["method"], status=str(status["code"]))
+
+
+class SamplingProfiler:
+    """
+    Opt-in cProfile sampler: profiles a sample_rate fraction of requests and
+    accumulates the results. Only one request is profiled at a time, and since
+    the profiler follows the thread, awaits inside that request also capture
+    whatever else the event loop ran meanwhile.
+    """
+
+    def __init__(self, sample_rate: float = 0.0):
+        self.sample_rate = sample_rate
+        self.profiled_requests = 0
+        self._stats = None
+        self._active = False
+
+    def should_sample(self) -> bool:
+        return self.sample_rate > 0 and not self._active and random.random() < self.sample_rate
+
+    def start(self):
+        # Imported on first sampled request so the profiler costs nothing when disabled.
+        import cProfile
+
+        self._active = True
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def stop(self, profiler) -> None:
+        import pstats
+
+        profiler.disable()
+        self._active = False
+        self.profiled_requests += 1
+        if self._stats is None:
+            self._stats = pstats.Stats(profiler)
+        else:
+            self._stats.add(profiler)
+
+    def report(self, limit: int = 40, sort_by: str = "cumulative") -> str:
+        if self._stats is None:
+            return "No requests profiled yet. Set PROFILE_SAMPLE_RATE above 0 to enable sampling.\n"
+        out = io.StringIO()
+        self._stats.stream = out
+        out.write(f"Profiled requests: {self.profiled_requests}\n")
+        self._stats.sort_stats(sort_by).print_stats(limit)
+        return out.getvalue()
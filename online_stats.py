@@ -0,0 +1,267 @@
+"""
+Online statistics for statistical anomaly scoring.
+
+Running mean/variance use Welford's algorithm (with Chan's merge for array
+updates) and per-location medians/p95 use the P-squared streaming quantile
+estimator. Every update and every z-score is O(1) and no history is kept, so
+the model can learn from each served simulation and be retrained from a
+stream of any length.
+"""
+import json
+import math
+import os
+import tempfile
+from typing import Dict, Optional, Tuple
+
+
+class RunningStats:
+    __slots__ = ("count", "mean", "m2")
+
+    def __init__(self, count: int = 0, mean: float = 0.0, m2: float = 0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    def update(self, value: float) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def update_batch(self, values) -> None:
+        # Only the offline trainer feeds arrays; keep numpy off the serving import path.
+        import numpy as np
+
+        values = np.asarray(values, dtype=np.float64)
+        if values.size == 0:
+            return
+        self.merge(RunningStats(int(values.size), float(values.mean()), float(((values - values.mean()) ** 2).sum())))
+
+    def merge(self, other: "RunningStats") -> None:
+        if other.count == 0:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.count = total
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+    def z_score(self, value: float, min_std: float = 0.0) -> Optional[float]:
+        std = max(self.std, min_std)
+        if self.count < 2 or std == 0.0:
+            return None
+        return (value - self.mean) / std
+
+    def to_dict(self) -> dict:
+        return {"count": self.count, "mean": self.mean, "m2": self.m2}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "RunningStats":
+        return cls(int(data["count"]), float(data["mean"]), float(data["m2"]))
+
+
+class P2Quantile:
+    """
+    P-squared estimator (Jain & Chlamtac, 1985): tracks one quantile with five
+    markers, adjusting their heights by piecewise-parabolic interpolation.
+    """
+
+    def __init__(self, quantile: float):
+        self.quantile = quantile
+        self.heights: list = []
+        self.positions = [1, 2, 3, 4, 5]
+        self.desired = [1, 1 + 2 * quantile, 1 + 4 * quantile, 3 + 2 * quantile, 5]
+        self.increments = [0, quantile / 2, quantile, (1 + quantile) / 2, 1]
+
+    def update(self, value: float) -> None:
+        heights = self.heights
+        if len(heights) < 5:
+            heights.append(value)
+            heights.sort()
+            return
+
+        if value < heights[0]:
+            heights[0] = value
+            cell = 0
+        elif value >= heights[4]:
+            heights[4] = value
+            cell = 3
+        else:
+            cell = 0
+            while value >= heights[cell + 1]:
+                cell += 1
+        for i in range(cell + 1, 5):
+            self.positions[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        for i in (1, 2, 3):
+            offset = self.desired[i] - self.positions[i]
+            if (offset >= 1 and self.positions[i + 1] - self.positions[i] > 1) or (offset <= -1 and self.positions[i - 1] - self.positions[i] < -1):
+                step = 1 if offset > 0 else -1
+                candidate = self._parabolic(i, step)
+                if not heights[i - 1] < candidate < heights[i + 1]:
+                    candidate = heights[i] + step * (heights[i + step] - heights[i]) / (self.positions[i + step] - self.positions[i])
+                heights[i] = candidate
+                self.positions[i] += step
+
+    def _parabolic(self, i: int, step: int) -> float:
+        q, n = self.heights, self.positions
+        return q[i] + step / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + step) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - step) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    def value(self) -> Optional[float]:
+        if not self.heights:
+            return None
+        if len(self.heights) < 5:
+            # Too few samples for the markers; use the exact quantile of what we have.
+            return float(self.heights[min(len(self.heights) - 1, int(round(self.quantile * (len(self.heights) - 1))))])
+        return self.heights[2]
+
+    def to_dict(self) -> dict:
+        return {"quantile": self.quantile, "heights": self.heights, "positions": self.positions, "desired": self.desired}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "P2Quantile":
+        sketch = cls(float(data["quantile"]))
+        sketch.heights = [float(h) for h in data["heights"]]
+        sketch.positions = [int(p) for p in data["positions"]]
+        sketch.desired = [float(d) for d in data["desired"]]
+        return sketch
+
+
+class LocationStats:
+    QUANTILES = (0.5, 0.95)
+
+    def __init__(self, stats: Optional[RunningStats] = None, sketches: Optional[Dict[float, P2Quantile]] = None):
+        self.stats = stats or RunningStats()
+        self.sketches = sketches or {q: P2Quantile(q) for q in self.QUANTILES}
+
+    def update(self, value: float) -> None:
+        self.stats.update(value)
+        for sketch in self.sketches.values():
+            sketch.update(value)
+
+    def to_dict(self) -> dict:
+        return {"stats": self.stats.to_dict(), "quantiles": {str(q): s.to_dict() for q, s in self.sketches.items()}}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "LocationStats":
+        sketches = {float(q): P2Quantile.from_dict(s) for q, s in data["quantiles"].items()}
+        return cls(RunningStats.from_dict(data["stats"]), sketches)
+
+
+class OnlineAnomalyModel:
+    """
+    Z-score model over yield per square meter. A location's own statistics are
+    used once it has min_location_samples observations; until then the global
+    statistics are used. min_std keeps a location that has only seen steady
+    weather from flagging its first change as extreme.
+    """
+
+    METRIC = "yield_per_sq_meter"
+
+    def __init__(self, z_threshold: float = 4.0, min_location_samples: int = 30, min_std: float = 0.25, max_locations: int = 10_000):
+        self.z_threshold = z_threshold
+        self.min_std = min_std
+        self.min_location_samples = min_location_samples
+        self.max_locations = max_locations
+        self.global_stats = RunningStats()
+        self.locations: Dict[str, LocationStats] = {}
+        self.updates_since_snapshot = 0
+
+    def update(self, location: str, value: float) -> None:
+        value = float(value)
+        self.global_stats.update(value)
+        stats = self.locations.get(location)
+        if stats is None and len(self.locations) < self.max_locations:
+            stats = self.locations[location] = LocationStats()
+        if stats is not None:
+            stats.update(value)
+        self.updates_since_snapshot += 1
+
+    def score(self, location: str, value: float) -> dict:
+        value = float(value)
+        stats = self.locations.get(location)
+        if stats is not None and stats.stats.count >= self.min_location_samples:
+            z_score, basis = stats.stats.z_score(value, self.min_std), "location"
+        else:
+            z_score, basis = self.global_stats.z_score(value, self.min_std), "global"
+        result = {
+            "z_score": None if z_score is None else round(z_score, 2),
+            "z_score_basis": basis,
+            "z_score_threshold": self.z_threshold,
+            "is_statistical_anomaly": z_score is not None and abs(z_score) > self.z_threshold,
+        }
+        if stats is not None:
+            result["location_p50"] = stats.sketches[0.5].value()
+            result["location_p95"] = stats.sketches[0.95].value()
+        return result
+
+    def to_dict(self) -> dict:
+        return {
+            "version": 2,
+            "metric": self.METRIC,
+            "global": self.global_stats.to_dict(),
+            "locations": {name: stats.to_dict() for name, stats in self.locations.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict, **kwargs) -> "OnlineAnomalyModel":
+        model = cls(**kwargs)
+        # Files from the old batch trainer have a different metric and cannot be continued.
+        if data.get("metric") == cls.METRIC:
+            model.global_stats = RunningStats.from_dict(data["global"])
+            model.locations = {name: LocationStats.from_dict(stats) for name, stats in data.get("locations", {}).items()}
+        return model
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "OnlineAnomalyModel":
+        try:
+            with open(path) as f:
+                return cls.from_dict(json.load(f), **kwargs)
+        except (OSError, ValueError, KeyError):
+            return cls(**kwargs)
+
+    def snapshot(self, path: str) -> None:
+        write_json_atomic(path, self.to_dict())
+        self.updates_since_snapshot = 0
+
+
+def write_json_atomic(path: str, data: dict) -> None:
+    """Write to a temp file in the same directory, then rename over the target."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".model_stats.", suffix=".tmp", dir=directory)
+    try:
+        # mkstemp creates the file as 0600 and os.replace keeps that mode.
+        os.chmod(tmp_path, 0o644)
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def file_signature(path: str) -> Optional[Tuple[int, int, int]]:
+    """Identifies one version of a file (os.replace gives every snapshot a new inode), or None if absent."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
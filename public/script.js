@@ -12,11 +12,9 @@ document.addEventListener('DOMContentLoaded', () => {
         showLoadingState();
 
         try {
-            const response = await fetch('/simulate', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ surface_area: surfaceArea, location: location }),
-            });
+            // Compact GET: the browser and CDN can reuse the result while the weather snapshot is fresh.
+            const params = new URLSearchParams({ surface_area: surfaceArea, location: location, compact: '1' });
+            const response = await fetch(`/simulate?${params}`);
             
             // This line is important to handle non-JSON error responses
             if (!response.ok) {
@@ -50,7 +48,7 @@ document.addEventListener('DOMContentLoaded', () => {
 
         resultDisplay.innerHTML = `
             <h3 class="display-4">${yieldValue} L/day</h3>
-            <p class="lead">Estimated daily water yield for <strong>${data.input_parameters.location}</strong>.</p>
+            <p class="lead">Estimated daily water yield for <strong>${data.location}</strong>.</p>
             <p class="text-muted">Based on live weather: ${humidity}% humidity at ${temp}°C.</p>
         `;
 
@@ -0,0 +1,62 @@
+"""
+Command-line bulk simulation over an NDJSON façade inventory.
+
+Usage:
+    python simulate_bulk.py fixtures/simulations.ndjson -o results.ndjson
+    cat inventory.ndjson | python simulate_bulk.py - > results.ndjson
+
+Each input line is a SimulationInput record ({"surface_area": ..., "location": ...}).
+Records are processed in fixed-size chunks with the same logic as
+POST /simulate/stream, so memory stays flat regardless of input size.
+
+Results are scored against the anomaly statistics but, unless --learn is
+given, do not update them: an offline inventory run should not retrain the
+statistics the API serves with.
+"""
+import argparse
+import asyncio
+import functools
+import sys
+
+from bulk import DEFAULT_CHUNK_SIZE, stream_simulations
+from main import simulate_items, snapshot_anomaly_model, weather_client
+
+READ_BLOCK_BYTES = 64 * 1024
+
+
+async def read_blocks(stream):
+    while True:
+        block = stream.read(READ_BLOCK_BYTES)
+        if not block:
+            break
+        yield block
+
+
+async def run(source, sink, chunk_size: int, learn: bool = False) -> None:
+    await weather_client.start()
+    try:
+        simulate = functools.partial(simulate_items, learn=learn)
+        async for lines in stream_simulations(read_blocks(source), simulate, chunk_size=chunk_size):
+            sink.write(lines)
+            sink.flush()
+    finally:
+        await weather_client.close()
+        if learn:
+            await snapshot_anomaly_model(force=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run water-yield simulations over an NDJSON inventory")
+    parser.add_argument("input", help="NDJSON input file, or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="NDJSON output file, or - for stdout (default)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--learn", action="store_true", help="also update the anomaly statistics (MODEL_STATS_PATH) from these results")
+    args = parser.parse_args()
+
+    source = sys.stdin.buffer if args.input == "-" else open(args.input, "rb")
+    sink = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    try:
+        asyncio.run(run(source, sink, args.chunk_size, learn=args.learn))
+    finally:
+        if source is not sys.stdin.buffer: source.close()
+        if sink is not sys.stdout.buffer: sink.close()
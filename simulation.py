@@ -0,0 +1,69 @@
+"""
+Yield model and anomaly rules.
+
+The scalar functions serve single /simulate calls and avoid NumPy, as does
+the forecast in forecast.py, so a single request never imports it; the array
+versions live in simulation_batch.py.
+"""
+from dataclasses import dataclass
+
+# --- Model Constants ---
+BASELINE_YIELD_PER_SQ_METER = 1.11
+BASELINE_HUMIDITY = 0.20
+# 10,000,000 m^2 is 10 square kilometers, a generous upper limit for a single building facade.
+MAX_SANE_SURFACE_AREA = 10_000_000.0
+MAX_PHYSICALLY_POSSIBLE_YIELD_PER_SQ_METER = 10.0
+
+@dataclass(frozen=True)
+class FacadeParameters:
+    """
+    Per-façade yield model. The defaults reproduce calculate_water_harvest;
+    temperature_coefficient scales yield by (1 + k * (T - reference)), and is 0 by default.
+    """
+    baseline_yield_per_sq_meter: float = BASELINE_YIELD_PER_SQ_METER
+    baseline_humidity: float = BASELINE_HUMIDITY
+    temperature_coefficient: float = 0.0
+    reference_temperature_celsius: float = 20.0
+
+DEFAULT_FACADE_PARAMETERS = FacadeParameters()
+
+# --- Core Logic ---
+def calculate_water_harvest(surface_area: float, relative_humidity: float) -> float:
+    if relative_humidity <= 0 or surface_area <= 0: return 0.0
+    humidity_factor = relative_humidity / BASELINE_HUMIDITY
+    estimated_yield = surface_area * BASELINE_YIELD_PER_SQ_METER * humidity_factor
+    return round(estimated_yield, 2)
+
+# --- NEW: Final, Correct, Rule-Based Anomaly Detection ---
+def get_anomaly_info(yield_value: float, surface_area: float) -> dict:
+    """
+    Checks if the result is anomalous based on two simple, robust rules.
+    Returns a dictionary with the flag and debug information.
+    """
+    # Rule 1: Check if the input surface area is nonsensical.
+    is_area_anomaly = surface_area > MAX_SANE_SURFACE_AREA
+
+    # Rule 2: Check if the yield per square meter is physically impossible.
+    # This catches data corruption errors (e.g., humidity > 100%).
+    yield_per_sq_meter = 0
+    if surface_area > 0:
+        yield_per_sq_meter = yield_value / surface_area
+
+    is_yield_anomaly = yield_per_sq_meter > MAX_PHYSICALLY_POSSIBLE_YIELD_PER_SQ_METER
+
+    # The final flag is true if EITHER rule is broken.
+    final_flag = is_area_anomaly or is_yield_anomaly
+
+    # This debug info will be sent to the frontend!
+    debug_info = {
+        "reasoning": "Anomaly is true if either the input area is too large or the yield per m^2 is physically impossible.",
+        "input_surface_area": surface_area,
+        "max_sane_surface_area": MAX_SANE_SURFACE_AREA,
+        "is_area_anomaly": is_area_anomaly,
+        "yield_per_sq_meter": round(yield_per_sq_meter, 2),
+        "max_yield_per_sq_meter": MAX_PHYSICALLY_POSSIBLE_YIELD_PER_SQ_METER,
+        "is_yield_anomaly": is_yield_anomaly,
+        "final_decision": final_flag
+    }
+
+    return {"is_anomaly": final_flag, "debug_info": debug_info}
@@ -0,0 +1,62 @@
+"""
+Vectorized versions of the yield model and anomaly rules.
+
+Each *_batch function applies the same arithmetic as its scalar counterpart in
+simulation.py to whole NumPy arrays and must return exactly what the scalar
+function would for every element, including round(..., 2).
+"""
+import numpy as np
+
+from simulation import (
+    BASELINE_HUMIDITY,
+    BASELINE_YIELD_PER_SQ_METER,
+    MAX_PHYSICALLY_POSSIBLE_YIELD_PER_SQ_METER,
+    MAX_SANE_SURFACE_AREA,
+)
+
+def round_2dp(values: np.ndarray) -> np.ndarray:
+    """
+    Element-wise equivalent of Python's round(x, 2).
+
+    np.round scales by 100 before rounding, which can pick the other side of a
+    tie that Python's correctly rounded round() would not. Only values whose
+    scaled fraction lands next to .5 can disagree, so those few are re-rounded
+    in Python and everything else stays vectorized.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    # inf/nan and huge values overflow here; they are either left alone or re-rounded below.
+    with np.errstate(over="ignore", invalid="ignore"):
+        rounded = np.round(values, 2)
+        scaled = values * 100.0
+        fraction = np.abs(scaled - np.trunc(scaled))
+        suspicious = np.isfinite(values) & ((np.abs(fraction - 0.5) < 1e-6) | (np.abs(values) >= 1e13))
+    for index in np.flatnonzero(suspicious):
+        rounded.flat[index] = round(float(values.flat[index]), 2)
+    return rounded
+
+def calculate_water_harvest_batch(surface_areas: np.ndarray, relative_humidities: np.ndarray) -> np.ndarray:
+    surface_areas = np.asarray(surface_areas, dtype=np.float64)
+    relative_humidities = np.asarray(relative_humidities, dtype=np.float64)
+    # Same operation order as the scalar version so every product is bit-identical.
+    humidity_factor = relative_humidities / BASELINE_HUMIDITY
+    estimated_yield = surface_areas * BASELINE_YIELD_PER_SQ_METER * humidity_factor
+    valid = (relative_humidities > 0) & (surface_areas > 0)
+    return np.where(valid, round_2dp(estimated_yield), 0.0)
+
+def get_anomaly_info_batch(yield_values: np.ndarray, surface_areas: np.ndarray) -> dict:
+    """
+    Applies both anomaly rules to whole arrays. Returns arrays for the flag,
+    each rule and the rounded yield per square meter.
+    """
+    yield_values = np.asarray(yield_values, dtype=np.float64)
+    surface_areas = np.asarray(surface_areas, dtype=np.float64)
+    is_area_anomaly = surface_areas > MAX_SANE_SURFACE_AREA
+    positive_area = surface_areas > 0
+    yield_per_sq_meter = np.divide(yield_values, surface_areas, out=np.zeros_like(yield_values), where=positive_area)
+    is_yield_anomaly = yield_per_sq_meter > MAX_PHYSICALLY_POSSIBLE_YIELD_PER_SQ_METER
+    return {
+        "is_anomaly": is_area_anomaly | is_yield_anomaly,
+        "is_area_anomaly": is_area_anomaly,
+        "is_yield_anomaly": is_yield_anomaly,
+        "yield_per_sq_meter": round_2dp(yield_per_sq_meter),
+    }
@@ -0,0 +1,12 @@
+import os
+import sys
+import tempfile
+
+# The modules live at the repository root, not in a package.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# main.py reads its configuration at import time. Tests never reach the real
+# upstream, and must never snapshot the anomaly statistics to disk.
+os.environ.setdefault("OPENWEATHERMAP_API_KEY", "test-key")
+os.environ["MODEL_STATS_SNAPSHOT_EVERY"] = "0"
+os.environ["MODEL_STATS_PATH"] = os.path.join(tempfile.mkdtemp(prefix="watergrid-tests-"), "model_stats.json")
@@ -0,0 +1,67 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+BODIES = {
+    "dubai": b'{"main": {"humidity": 60, "temp": 30.0}}',
+    "garbled": b"<html>upstream proxy error</html>",
+    "nomain": b'{"cod": 200, "weather": []}',
+    "listmain": b'{"main": []}',
+}
+
+
+def upstream(request: httpx.Request) -> httpx.Response:
+    city = request.url.params["q"].casefold()
+    if city not in BODIES:
+        return httpx.Response(404, json={"cod": "404"})
+    return httpx.Response(200, content=BODIES[city], headers={"content-type": "application/json"})
+
+
+@pytest.fixture
+def mocked_upstream(monkeypatch):
+    client = httpx.AsyncClient(transport=httpx.MockTransport(upstream))
+    monkeypatch.setattr(main.weather_client, "_client", client)
+    main.weather_cache.clear()
+    yield
+    main.weather_cache.clear()
+
+
+def test_malformed_upstream_bodies_become_per_item_errors(mocked_upstream):
+    items = [
+        {"surface_area": 10, "location": "Dubai"},
+        {"surface_area": 10, "location": "Garbled"},
+        {"surface_area": 10, "location": "NoMain"},
+        {"surface_area": 10, "location": "ListMain"},
+        {"surface_area": 10, "location": "Atlantis"},
+        {"surface_area": -1, "location": "Dubai"},
+    ]
+    results = asyncio.run(main.simulate_items(items))
+
+    assert results[0]["estimated_yield_liters_per_day"] == 33.3
+    assert [result.get("error", {}).get("status_code") for result in results] == [None, 502, 502, 502, 404, 422]
+    assert [result["index"] for result in results] == list(range(len(items)))
+
+
+def test_simulate_items_without_learning_leaves_statistics_alone(mocked_upstream):
+    before = main.anomaly_model.to_dict()
+    results = asyncio.run(main.simulate_items([{"surface_area": 10, "location": "Dubai"}] * 5, learn=False))
+    assert all("error" not in result for result in results)
+    assert main.anomaly_model.to_dict() == before
+
+    asyncio.run(main.simulate_items([{"surface_area": 10, "location": "Dubai"}], learn=True))
+    assert main.anomaly_model.to_dict() != before
+
+
+def test_batch_and_stream_endpoints_do_not_learn(mocked_upstream):
+    client = TestClient(main.app)
+    before = main.anomaly_model.to_dict()
+    batch = client.post("/simulate/batch", json={"items": [{"surface_area": 10, "location": "Dubai"}] * 50})
+    assert batch.json()["succeeded"] == 50
+    stream = client.post("/simulate/stream", content=b'{"surface_area": 10, "location": "Dubai"}\n' * 50)
+    assert stream.status_code == 200 and len(stream.content.splitlines()) == 50
+    assert main.anomaly_model.to_dict() == before
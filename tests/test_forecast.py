@@ -0,0 +1,62 @@
+import json
+import random
+
+import numpy as np
+
+from fake_weather_server import forecast_for
+from forecast import ForecastFixture, constant_series, forecast_yield, parse_owm_forecast, simulate_daily_yield
+from forecast_batch import forecast_yields, simulate_daily_yields
+from simulation import FacadeParameters, calculate_water_harvest
+
+
+def random_series(rng: random.Random, days: int) -> dict:
+    return {
+        "relative_humidity": [[rng.uniform(-0.05, 1.0) for _ in range(24)] for _ in range(days)],
+        "temperature_celsius": [[rng.uniform(-10.0, 45.0) for _ in range(24)] for _ in range(days)],
+    }
+
+
+def test_single_facade_agrees_with_batch_engine():
+    rng = random.Random(7)
+    params = [FacadeParameters(), FacadeParameters(temperature_coefficient=0.02, baseline_yield_per_sq_meter=0.93)]
+    for _ in range(300):
+        series = random_series(rng, days=7)
+        area = rng.choice([0.0, -5.0, rng.uniform(0.1, 5000.0)])
+        for p in params:
+            expected = simulate_daily_yields([area], series["relative_humidity"], series["temperature_celsius"], p)[0]
+            actual = simulate_daily_yield(area, series["relative_humidity"], series["temperature_celsius"], p)
+            assert np.allclose(actual, expected, rtol=1e-12, atol=0.0)
+            # The two sums may differ in the last bit, which can only flip a rounding tie.
+            assert np.abs(np.array(forecast_yield(area, series, p)) - forecast_yields([area], series, p)[0]).max() <= 0.01 + 1e-9
+
+
+def test_constant_weather_matches_scalar_model():
+    for humidity in (0.05, 0.2, 0.42, 0.5, 0.97):
+        series = constant_series(humidity, 25.0, days=7)
+        assert forecast_yield(120.0, series) == [calculate_water_harvest(120.0, humidity)] * 7
+
+
+def test_parse_matches_numpy_interp():
+    data = {"list": forecast_for("Dubai")}
+    random.Random(3).shuffle(data["list"])
+    series = parse_owm_forecast(data, days=7)
+    points = sorted(data["list"], key=lambda point: point["dt"])
+    timestamps = np.array([point["dt"] for point in points], dtype=np.float64)
+    hours = timestamps[0] + 3600 * np.arange(7 * 24, dtype=np.float64)
+    beyond = hours > timestamps[-1]
+    hours[beyond] -= np.ceil((hours[beyond] - timestamps[-1]) / 86400) * 86400
+    humidity = np.interp(hours, timestamps, np.array([point["main"]["humidity"] for point in points], dtype=np.float64) / 100)
+    temperature = np.interp(hours, timestamps, np.array([point["main"]["temp"] for point in points], dtype=np.float64))
+    assert series["relative_humidity"] == humidity.reshape(7, 24).tolist()
+    assert series["temperature_celsius"] == temperature.reshape(7, 24).tolist()
+    assert series["source"] == "forecast"
+
+
+def test_fixture_cycles_days(tmp_path):
+    path = tmp_path / "hourly.json"
+    path.write_text(json.dumps({"Dubai": {"relative_humidity": [[0.3] * 24, [0.6] * 24], "temperature_celsius": [[20] * 24, [30] * 24]}}))
+    fixture = ForecastFixture(str(path))
+    series = fixture.get("  dubai ", days=3)
+    assert [day[0] for day in series["relative_humidity"]] == [0.3, 0.6, 0.3]
+    assert [day[0] for day in series["temperature_celsius"]] == [20.0, 30.0, 20.0]
+    assert fixture.get("Oslo", days=3) is None
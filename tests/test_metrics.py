@@ -0,0 +1,34 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import main
+from metrics import MetricsRegistry
+
+
+def test_profile_endpoint_is_absent_while_sampling_is_off():
+    assert main.PROFILE_SAMPLE_RATE == 0
+    client = TestClient(main.app)
+    assert client.get("/metrics/profile").status_code == 404
+    assert client.get("/metrics").status_code == 200
+
+
+def test_profile_limit_is_capped():
+    app = FastAPI()
+    app.add_api_route("/metrics/profile", main.get_profile, methods=["GET"])
+    client = TestClient(app)
+    assert client.get("/metrics/profile", params={"limit": 10}).status_code == 200
+    assert client.get("/metrics/profile", params={"limit": main.PROFILE_REPORT_MAX_LINES + 1}).status_code == 422
+    assert client.get("/metrics/profile", params={"limit": 0}).status_code == 422
+    assert client.get("/metrics/profile", params={"sort": "name"}).status_code == 422
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    registry.describe("latency_seconds", "histogram", "Test latency.")
+    for value in (0.00001, 0.003, 0.003, 20.0):
+        registry.observe("latency_seconds", value, route="/x")
+    lines = registry.render().splitlines()
+    assert 'latency_seconds_bucket{route="/x",le="5e-05"} 1' in lines
+    assert 'latency_seconds_bucket{route="/x",le="0.005"} 3' in lines
+    assert 'latency_seconds_bucket{route="/x",le="+Inf"} 4' in lines
+    assert 'latency_seconds_count{route="/x"} 4' in lines
@@ -0,0 +1,45 @@
+import json
+import logging
+import os
+import stat
+
+import main
+from online_stats import OnlineAnomalyModel, file_signature, write_json_atomic
+
+
+def test_snapshots_are_world_readable(tmp_path):
+    path = tmp_path / "model_stats.json"
+    write_json_atomic(str(path), {"a": 1})
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o644
+    assert json.loads(path.read_text()) == {"a": 1}
+    assert [entry.name for entry in tmp_path.iterdir()] == ["model_stats.json"]
+
+
+def test_model_round_trips_through_a_snapshot(tmp_path):
+    model = OnlineAnomalyModel()
+    for value in (2.0, 2.5, 3.0, 2.2, 2.8):
+        model.update("dubai", value)
+    path = str(tmp_path / "model_stats.json")
+    model.snapshot(path)
+    assert OnlineAnomalyModel.load(path).to_dict() == model.to_dict()
+
+
+def test_runtime_snapshots_never_target_the_committed_seed():
+    assert os.path.abspath(main.MODEL_STATS_PATH) != os.path.abspath(main.MODEL_STATS_SEED_PATH)
+
+
+def test_overwriting_another_process_snapshot_is_logged(tmp_path, monkeypatch, caplog):
+    path = str(tmp_path / "model_stats.json")
+    monkeypatch.setattr(main, "MODEL_STATS_PATH", path)
+    monkeypatch.setattr(main, "_snapshot_signature", file_signature(path))
+
+    with caplog.at_level(logging.WARNING, logger="watergrid"):
+        main.write_model_snapshot({"n": 1})
+        main.write_model_snapshot({"n": 2})
+    assert caplog.records == []
+
+    write_json_atomic(path, {"n": "other worker"})
+    with caplog.at_level(logging.WARNING, logger="watergrid"):
+        main.write_model_snapshot({"n": 3})
+    assert len(caplog.records) == 1 and "another process" in caplog.records[0].getMessage()
+    assert json.loads(open(path).read()) == {"n": 3}
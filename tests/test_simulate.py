@@ -0,0 +1,182 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+class Upstream:
+    """Mock OpenWeatherMap: current weather always works, the forecast can be switched off."""
+
+    def __init__(self):
+        self.forecast_status = 200
+        self.forecast_body = None
+        self.calls = {"/data/2.5/weather": 0, "/data/2.5/forecast": 0}
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.calls[request.url.path] += 1
+        if request.url.path == "/data/2.5/weather":
+            return httpx.Response(200, json={"main": {"humidity": 50, "temp": 20.0}})
+        if self.forecast_status != 200:
+            return httpx.Response(self.forecast_status, json={"cod": str(self.forecast_status)})
+        if self.forecast_body is not None:
+            return httpx.Response(200, content=self.forecast_body, headers={"content-type": "application/json"})
+        start = 1_700_000_000
+        return httpx.Response(200, json={"list": [
+            {"dt": start + 3 * 3600 * step, "main": {"humidity": 40 + step // 8 * 5, "temp": 18.0 + step % 8}}
+            for step in range(40)
+        ]})
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    fake = Upstream()
+    monkeypatch.setattr(main.weather_client, "_client", httpx.AsyncClient(transport=httpx.MockTransport(fake)))
+    for breaker in (main.weather_client.breaker, main.forecast_breaker):
+        breaker.record_success()
+    main.weather_cache.clear()
+    main.forecast_cache.clear()
+    main._forecast_failed_at.clear()
+    yield fake
+    main.weather_cache.clear()
+    main.forecast_cache.clear()
+    main._forecast_failed_at.clear()
+
+
+def simulate(client: TestClient, location: str = "Dubai", surface_area: float = 100.0):
+    return client.post("/simulate", json={"surface_area": surface_area, "location": location})
+
+
+def test_forecast_outage_falls_back_without_hurting_current_weather(upstream):
+    upstream.forecast_status = 500
+    client = TestClient(main.app)
+    for _ in range(main.WEATHER_BREAKER_FAILURE_THRESHOLD + 3):
+        response = simulate(client)
+        assert response.status_code == 200
+        assert response.json()["forecast_7_day"] == [response.json()["estimated_yield_liters_per_day"]] * main.FORECAST_DAYS
+    # The failed forecast is reused as a fallback instead of being retried on every request.
+    assert upstream.calls["/data/2.5/forecast"] == 1
+    assert main.weather_client.breaker.state == "closed"
+
+    for city in ("Lima", "Oslo", "Rome", "Pune", "Doha", "Kyiv"):
+        assert simulate(client, city).status_code == 200
+    assert main.forecast_breaker.state == "open"
+    assert main.weather_client.breaker.state == "closed"
+
+
+@pytest.mark.parametrize("body", [
+    b'{"list": null}',
+    b'{"list": [{"dt": 1700000000, "main": null}]}',
+    b'{"list": [{"dt": 1700000000, "main": {"humidity": null, "temp": 20.0}}]}',
+    b'[{"dt": 1700000000}]',
+    b'{"list": []}',
+    b'not json',
+])
+def test_malformed_forecast_falls_back(upstream, body):
+    upstream.forecast_body = body
+    response = simulate(TestClient(main.app))
+    assert response.status_code == 200
+    assert response.json()["forecast_7_day"] == [response.json()["estimated_yield_liters_per_day"]] * main.FORECAST_DAYS
+
+
+def test_forecast_is_retried_after_the_failure_ttl(upstream, monkeypatch):
+    upstream.forecast_status = 503
+    client = TestClient(main.app)
+    simulate(client)
+    upstream.forecast_status = 200
+    monkeypatch.setattr(main, "FORECAST_FAILURE_TTL_SECONDS", 0.0)
+    forecast = simulate(client).json()["forecast_7_day"]
+    assert upstream.calls["/data/2.5/forecast"] == 2
+    assert len(set(forecast)) > 1
+
+
+def test_verbose_response_shape_is_unchanged(upstream):
+    body = simulate(TestClient(main.app)).json()
+    assert list(body) == [
+        "input_parameters", "live_weather_data", "estimated_yield_liters_per_day",
+        "forecast_7_day", "anomaly_flag", "statistical_anomaly_flag", "debug_info",
+    ]
+    assert body["input_parameters"] == {"surface_area": 100.0, "location": "Dubai"}
+    assert body["estimated_yield_liters_per_day"] == 277.5
+    assert len(body["forecast_7_day"]) == main.FORECAST_DAYS
+    assert json.dumps(body)
+
+
+def test_sweep_loads_the_grid_on_first_use(upstream, monkeypatch):
+    monkeypatch.setattr(main, "_yield_grid", None)
+    response = TestClient(main.app).post("/simulate/sweep", json={"surface_areas": [10, 20], "relative_humidities": [0.5, 0.7], "temperature_celsius": 20})
+    assert response.status_code == 200
+    assert response.json()["estimated_yield_liters_per_day"] == [[27.75, 55.5], [38.85, 77.7]]
+    assert main._yield_grid is not None
+
+
+def test_revalidation_does_not_count_as_a_new_simulation(upstream):
+    client = TestClient(main.app)
+    query = {"location": "Dubai", "surface_area": 100.0, "compact": 1}
+    first = client.get("/simulate", params=query)
+    assert first.status_code == 200
+    assert first.headers["cache-control"].startswith("public")
+
+    # A new upstream reading with the same values: the body, and so the ETag, is unchanged.
+    main.weather_cache.clear()
+    learned = main.anomaly_model.to_dict()
+    revalidated = client.get("/simulate", params=query, headers={"If-None-Match": first.headers["etag"]})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == first.headers["etag"]
+    assert main.anomaly_model.to_dict() == learned
+
+    assert client.get("/simulate", params=query).status_code == 200
+    assert main.anomaly_model.to_dict() != learned
+
+
+def test_compact_post_is_not_cacheable(upstream):
+    client = TestClient(main.app)
+    body = {"surface_area": 100.0, "location": "Dubai"}
+    response = client.post("/simulate?compact=1", json=body)
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == "no-store"
+    assert "etag" not in response.headers
+
+    main.weather_cache.clear()
+    learned = main.anomaly_model.to_dict()
+    assert client.post("/simulate?compact=1", json=body, headers={"If-None-Match": "*"}).status_code == 412
+    assert main.anomaly_model.to_dict() == learned
+    assert client.post("/simulate?compact=1", json=body, headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+@pytest.mark.parametrize("body", [
+    b'{"surface_areas": [10], "relative_humidities": [NaN], "temperature_celsius": 20}',
+    b'{"surface_areas": [Infinity], "relative_humidities": [0.5], "temperature_celsius": 20}',
+    b'{"surface_areas": [1e308], "relative_humidities": [0.5], "temperature_celsius": 20}',
+    b'{"surface_areas": [10], "relative_humidities": [1.5], "temperature_celsius": 20}',
+    b'{"surface_areas": [10], "relative_humidities": [0.5], "temperature_celsius": -Infinity}',
+])
+def test_sweep_rejects_non_finite_and_out_of_range_axes(upstream, body):
+    response = TestClient(main.app).post("/simulate/sweep", content=body, headers={"content-type": "application/json"})
+    assert response.status_code == 422
+
+
+def test_non_finite_simulate_input_is_a_422(upstream):
+    response = TestClient(main.app).post("/simulate", content=b'{"surface_area": NaN, "location": "Dubai"}', headers={"content-type": "application/json"})
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["input"] == "nan"
+
+
+def test_one_weather_reading_is_learned_once(upstream):
+    client = TestClient(main.app)
+    simulate(client)
+    learned = main.anomaly_model.to_dict()
+
+    # More requests and a batch on the same cached reading are scored, not learned.
+    for area in (50.0, 100.0, 250.0, 100.0):
+        assert simulate(client, surface_area=area).status_code == 200
+    asyncio.run(main.simulate_items([{"surface_area": area, "location": " DUBAI "} for area in (10, 20, 30)], learn=True))
+    assert main.anomaly_model.to_dict() == learned
+
+    count = main.anomaly_model.locations["dubai"].stats.count
+    main.weather_cache.clear()
+    simulate(client)
+    assert main.anomaly_model.locations["dubai"].stats.count == count + 1
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from simulation import calculate_water_harvest, get_anomaly_info
+from simulation_batch import calculate_water_harvest_batch, get_anomaly_info_batch, round_2dp
+
+
+def near_ties(count: int, rng: np.random.Generator) -> np.ndarray:
+    """Values whose third decimal is a 5, plus their float neighbours on both sides."""
+    cents = rng.integers(-10**9, 10**9, count)
+    ties = (cents + 0.5) / 100.0
+    return np.concatenate([
+        ties,
+        np.nextafter(ties, np.inf),
+        np.nextafter(ties, -np.inf),
+        np.nextafter(np.nextafter(ties, np.inf), np.inf),
+    ])
+
+
+@pytest.mark.parametrize("scale", [1.0, 1e3, 1e6, 1e12])
+def test_round_2dp_matches_python_round_on_near_ties(scale):
+    rng = np.random.default_rng(20240601)
+    values = near_ties(20_000, rng)
+    values = np.concatenate([values, values / 1e9 * scale])
+    expected = [round(float(value), 2) for value in values]
+    assert round_2dp(values).tolist() == expected
+
+
+def test_round_2dp_matches_python_round_on_edge_values():
+    values = np.array([0.0, -0.0, 0.005, 0.015, 0.125, 1.005, 2.675, 1e13 + 0.005, 1e16, -2.675, 5e-324, 1.7976931348623157e308])
+    assert round_2dp(values).tolist() == [round(float(value), 2) for value in values]
+    assert np.isnan(round_2dp(np.array([np.nan]))[0])
+    assert round_2dp(np.array([np.inf]))[0] == np.inf
+
+
+def test_round_2dp_keeps_shape():
+    values = np.arange(12, dtype=np.float64).reshape(3, 4) / 8
+    assert round_2dp(values).shape == (3, 4)
+
+
+def test_batch_functions_match_scalar_functions():
+    rng = np.random.default_rng(7)
+    surface_areas = np.concatenate([rng.uniform(0.01, 5000, 20_000), [0.0, -1.0, 1e7, 1.2e7]])
+    humidities = np.concatenate([rng.uniform(0.0, 1.0, 20_000), [0.5, 0.5, 0.9, 0.0]])
+    yields = calculate_water_harvest_batch(surface_areas, humidities)
+    anomalies = get_anomaly_info_batch(yields, surface_areas)
+    for position, (area, humidity) in enumerate(zip(surface_areas.tolist(), humidities.tolist())):
+        expected_yield = calculate_water_harvest(area, humidity)
+        expected_anomaly = get_anomaly_info(expected_yield, area)
+        assert yields[position] == expected_yield
+        assert bool(anomalies["is_anomaly"][position]) == expected_anomaly["is_anomaly"]
+        assert anomalies["yield_per_sq_meter"][position] == expected_anomaly["debug_info"]["yield_per_sq_meter"]
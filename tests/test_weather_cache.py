@@ -0,0 +1,179 @@
+import asyncio
+import gc
+
+import pytest
+
+from weather_cache import WeatherCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class RecordingFetcher:
+    """Returns a new value on every call; optionally waits for `release` first."""
+
+    def __init__(self, fail: bool = False):
+        self.calls = []
+        self.release = None
+        self.fail = fail
+
+    async def __call__(self, city: str) -> dict:
+        self.calls.append(city)
+        if self.release is not None:
+            await self.release.wait()
+        if self.fail:
+            raise RuntimeError(f"upstream down for {city}")
+        return {"city": city, "version": len(self.calls)}
+
+
+def make_cache(fetcher, clock, **kwargs):
+    return WeatherCache(fetcher, ttl_seconds=kwargs.pop("ttl_seconds", 10.0), stale_seconds=kwargs.pop("stale_seconds", 20.0), clock=clock, **kwargs)
+
+
+def test_fresh_entries_are_served_from_memory():
+    async def scenario():
+        fetcher, clock = RecordingFetcher(), FakeClock()
+        cache = make_cache(fetcher, clock)
+        first = await cache.get("Dubai")
+        clock.now += 9.9
+        assert await cache.get("  dubai ") is first
+        assert fetcher.calls == ["Dubai"]
+        assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_misses_share_one_fetch():
+    async def scenario():
+        fetcher, clock = RecordingFetcher(), FakeClock()
+        fetcher.release = asyncio.Event()
+        cache = make_cache(fetcher, clock)
+        callers = [asyncio.ensure_future(cache.get(city)) for city in ("Paris", "paris", "PARIS ")]
+        await asyncio.sleep(0)
+        fetcher.release.set()
+        results = await asyncio.gather(*callers)
+        assert fetcher.calls == ["Paris"]
+        assert all(result is results[0] for result in results)
+        assert cache.stats()["coalesced"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_stale_entry_is_served_while_one_refresh_runs():
+    async def scenario():
+        fetcher, clock = RecordingFetcher(), FakeClock()
+        cache = make_cache(fetcher, clock)
+        await cache.get("Lima")
+        clock.now += 15.0  # past the TTL, inside the stale window
+        fetcher.release = asyncio.Event()
+        assert (await cache.get("Lima"))["version"] == 1
+        assert (await cache.get("Lima"))["version"] == 1
+        assert cache.stats()["refreshes"] == 1 and cache.stats()["stale_hits"] == 2
+
+        fetcher.release.set()
+        for _ in range(3):
+            await asyncio.sleep(0)
+        assert (await cache.get("Lima"))["version"] == 2
+        assert len(fetcher.calls) == 2
+
+    asyncio.run(scenario())
+
+
+def test_failed_refresh_keeps_serving_stale_value():
+    async def scenario():
+        fetcher, clock = RecordingFetcher(), FakeClock()
+        cache = make_cache(fetcher, clock)
+        await cache.get("Lima")
+        clock.now += 15.0
+        fetcher.fail = True
+        assert (await cache.get("Lima"))["version"] == 1
+        for _ in range(3):
+            await asyncio.sleep(0)
+        assert cache.stats()["refresh_errors"] == 1
+        assert (await cache.get("Lima"))["version"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_expired_entry_waits_for_a_new_fetch():
+    async def scenario():
+        fetcher, clock = RecordingFetcher(), FakeClock()
+        cache = make_cache(fetcher, clock)
+        await cache.get("Oslo")
+        clock.now += 30.0  # past TTL + stale window
+        assert (await cache.get("Oslo"))["version"] == 2
+        assert cache.stats()["misses"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_errors_are_not_cached():
+    async def scenario():
+        fetcher, clock = RecordingFetcher(fail=True), FakeClock()
+        cache = make_cache(fetcher, clock)
+        with pytest.raises(RuntimeError):
+            await cache.get("Nowhere")
+        with pytest.raises(RuntimeError):
+            await cache.get("Nowhere")
+        assert len(fetcher.calls) == 2
+        assert cache.stats()["size"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_least_recently_used_entry_is_evicted():
+    async def scenario():
+        fetcher, clock = RecordingFetcher(), FakeClock()
+        cache = make_cache(fetcher, clock, max_entries=2)
+        await cache.get("a")
+        await cache.get("b")
+        await cache.get("a")  # "b" is now least recently used
+        await cache.get("c")
+        assert cache.get_entry("a") is not None
+        assert cache.get_entry("b") is None
+        assert cache.get_entry("c") is not None
+        assert cache.stats()["evictions"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_fresh_for_counts_down_to_zero():
+    async def scenario():
+        fetcher, clock = RecordingFetcher(), FakeClock()
+        cache = make_cache(fetcher, clock)
+        assert cache.fresh_for("Rome") == 0.0
+        await cache.get("Rome")
+        clock.now += 4.0
+        assert cache.fresh_for("rome") == pytest.approx(6.0)
+        clock.now += 10.0
+        assert cache.fresh_for("rome") == 0.0
+
+    asyncio.run(scenario())
+
+
+def test_failed_fetch_with_all_callers_cancelled_is_not_reported_unretrieved():
+    reported = []
+
+    async def scenario():
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: reported.append(context))
+        fetcher, clock = RecordingFetcher(fail=True), FakeClock()
+        fetcher.release = asyncio.Event()
+        cache = make_cache(fetcher, clock)
+        caller = asyncio.ensure_future(cache.get("Nowhere"))
+        await asyncio.sleep(0)
+        caller.cancel()
+        await asyncio.gather(caller, return_exceptions=True)
+        fetcher.release.set()
+        for _ in range(3):
+            await asyncio.sleep(0)
+        assert cache.stats()["inflight"] == 0
+        gc.collect()
+
+    asyncio.run(scenario())
+    gc.collect()
+    assert not [context for context in reported if "never retrieved" in context.get("message", "")]
@@ -0,0 +1,107 @@
+import asyncio
+
+import httpx
+import pytest
+
+from weather_client import CircuitBreaker, CircuitOpenError, RetryBudget, UpstreamConnectionError, UpstreamTimeoutError, WeatherClient
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_client(handler, clock, failure_threshold=1) -> WeatherClient:
+    client = WeatherClient(
+        max_retries=0,
+        retry_budget=RetryBudget(min_tokens=0),
+        breaker=CircuitBreaker(failure_threshold=failure_threshold, reset_seconds=10.0, clock=clock),
+    )
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client
+
+
+def open_breaker(client: WeatherClient, clock: FakeClock) -> None:
+    """Opens the breaker and waits out the reset, so the next call is the half-open trial."""
+    client.breaker.record_failure()
+    assert client.breaker.state == "open"
+    clock.now += 10.0
+
+
+def test_breaker_opens_and_recovers_after_a_successful_trial():
+    async def scenario():
+        clock = FakeClock()
+        client = make_client(lambda request: httpx.Response(200, json={}), clock)
+        client.breaker.record_failure()
+        with pytest.raises(CircuitOpenError):
+            await client.get("http://weather.test/")
+        clock.now += 10.0
+        assert (await client.get("http://weather.test/")).status_code == 200
+        assert client.breaker.state == "closed"
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_trial_does_not_wedge_the_breaker():
+    async def scenario():
+        clock = FakeClock()
+        started = asyncio.Event()
+        responding = {"hang": True}
+
+        async def handler(request):
+            if responding["hang"]:
+                started.set()
+                await asyncio.sleep(3600)
+            return httpx.Response(200, json={})
+
+        client = make_client(handler, clock)
+        open_breaker(client, clock)
+        trial = asyncio.ensure_future(client.get("http://weather.test/"))
+        await started.wait()
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+
+        responding["hang"] = False
+        assert (await client.get("http://weather.test/")).status_code == 200
+        assert client.breaker.state == "closed"
+
+    asyncio.run(scenario())
+
+
+def test_unusable_reply_counts_as_failure_and_frees_the_trial():
+    async def scenario():
+        clock = FakeClock()
+
+        def handler(request):
+            raise httpx.DecodingError("bad gzip", request=request)
+
+        client = make_client(handler, clock)
+        open_breaker(client, clock)
+        with pytest.raises(UpstreamConnectionError):
+            await client.get("http://weather.test/")
+        assert client.breaker.state == "open"
+        clock.now += 10.0
+        assert client.breaker.allow_request()
+
+    asyncio.run(scenario())
+
+
+def test_pool_timeout_is_not_held_against_the_upstream():
+    async def scenario():
+        clock = FakeClock()
+
+        def handler(request):
+            raise httpx.PoolTimeout("no free connection", request=request)
+
+        client = make_client(handler, clock)
+        for _ in range(3):
+            with pytest.raises(UpstreamTimeoutError):
+                await client.get("http://weather.test/")
+        assert client.breaker.state == "closed"
+        assert client.breaker.consecutive_failures == 0
+
+    asyncio.run(scenario())
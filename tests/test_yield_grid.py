@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+import yield_grid
+from simulation import BASELINE_HUMIDITY, BASELINE_YIELD_PER_SQ_METER, FacadeParameters, calculate_water_harvest
+from yield_grid import TEMPERATURE_AXIS, YieldGrid, check_accuracy, grid_version, load_grid, saved_version, yield_rate_per_sq_meter
+
+
+@pytest.fixture(scope="module")
+def grid() -> YieldGrid:
+    return YieldGrid.build()
+
+
+def scalar_yields(areas, humidities) -> np.ndarray:
+    return np.array([calculate_water_harvest(float(a), float(h)) for a, h in zip(areas, humidities)])
+
+
+def test_committed_grid_matches_the_current_model():
+    # Fails when the model constants change without `python yield_grid.py` being rerun.
+    assert saved_version() == grid_version()
+    np.testing.assert_array_equal(np.load(yield_grid.GRID_FILE), YieldGrid.build().table)
+
+
+def test_rate_matches_model_on_and_between_grid_points(grid):
+    rng = np.random.default_rng(1)
+    humidities = np.concatenate([grid.humidity_axis, rng.uniform(0.0, 1.0, 5000)])
+    temperatures = np.concatenate([np.full(len(grid.humidity_axis), 20.0), rng.uniform(*TEMPERATURE_AXIS[:2], 5000)])
+    np.testing.assert_allclose(grid.rate(humidities, temperatures), yield_rate_per_sq_meter(humidities, temperatures), rtol=1e-12, atol=1e-12)
+
+
+def test_rate_outside_the_grid_uses_the_model_instead_of_clamping(grid):
+    humidities = np.array([1.2, 3.0, -0.1, 0.5, 0.5, 1.5])
+    temperatures = np.array([20.0, 20.0, 20.0, -45.0, 65.0, 80.0])
+    expected = yield_rate_per_sq_meter(humidities, temperatures)
+    np.testing.assert_array_equal(grid.rate(humidities, temperatures), expected)
+    assert grid.rate(1.2, 20.0) > grid.rate(1.0, 20.0)
+
+
+def test_sweep_matches_calculate_water_harvest(grid):
+    areas = np.array([0.5, 1.0, 12.34, 120.0, 999.99, 4321.0])
+    humidities = np.concatenate([np.linspace(0.01, 1.0, 37), [1.1, 1.75, 2.5]])
+    swept = grid.sweep(areas, humidities, 20.0)
+    assert swept.shape == (len(humidities), len(areas))
+    expected = np.array([scalar_yields(areas, np.full(len(areas), h)) for h in humidities])
+    # Interpolation can move a value across a rounding boundary by at most one step,
+    # and only where the exact result sits on that boundary (a ...5 in the third decimal).
+    assert np.abs(swept - expected).max() <= 0.01 + 1e-9
+    unrounded = areas[np.newaxis, :] * BASELINE_YIELD_PER_SQ_METER * (humidities[:, np.newaxis] / BASELINE_HUMIDITY)
+    distance_to_tie = np.abs((unrounded * 100) % 1 - 0.5)
+    assert (distance_to_tie[swept != expected] < 1e-6).all()
+
+
+def test_sweep_clips_non_positive_areas_like_the_scalar_model(grid):
+    swept = grid.sweep([0.0, -5.0, 10.0], [0.0, 0.5], 20.0)
+    np.testing.assert_array_equal(swept[:, :2], 0.0)
+    assert swept[1, 2] == calculate_water_harvest(10.0, 0.5)
+
+
+def test_random_points_pass_the_accuracy_check(grid):
+    report = check_accuracy(grid, samples=20_000, seed=3)
+    assert report["passed"], report
+    assert report["exact_matches"] >= 0.99 * report["samples"]
+
+
+def test_temperature_dependent_parameters_interpolate_exactly_enough():
+    params = FacadeParameters(temperature_coefficient=0.02, reference_temperature_celsius=15.0)
+    grid = YieldGrid.build(params)
+    rng = np.random.default_rng(2)
+    humidities = rng.uniform(0.0, 1.0, 2000)
+    temperatures = rng.uniform(-20.0, 40.0, 2000)  # keeps 1 + k*(T - ref) positive, where the model is bilinear
+    np.testing.assert_allclose(grid.rate(humidities, temperatures), yield_rate_per_sq_meter(humidities, temperatures, params), rtol=1e-9)
+
+
+def test_load_grid_rebuilds_and_saves_a_stale_table(tmp_path, monkeypatch):
+    monkeypatch.setattr(yield_grid, "GRID_FILE", str(tmp_path / "yield_grid.npy"))
+    monkeypatch.setattr(yield_grid, "GRID_META_FILE", str(tmp_path / "yield_grid.json"))
+    params = FacadeParameters(baseline_yield_per_sq_meter=2.0)
+    assert saved_version() == ""
+    built = load_grid(params)
+    assert saved_version() == grid_version(params)
+    reloaded = load_grid(params)
+    assert isinstance(reloaded.table, np.memmap)
+    np.testing.assert_array_equal(reloaded.table, built.table)
@@ -1,38 +1,61 @@
-import pandas as pd
-import numpy as np
+import argparse
 import json
 
+import numpy as np
+
+from online_stats import OnlineAnomalyModel
+from simulation import BASELINE_HUMIDITY, BASELINE_YIELD_PER_SQ_METER
+from weather_cache import WeatherCache
+
 print("--- Statistical Model Training Script ---")
 
 # --- 1. Configuration ---
 NUM_SAMPLES = 1000
-MODEL_FILE_NAME = "model_stats.json" # We will now save to a simple JSON file
-YIELD_FACTOR = 250
-
-# --- 2. Generate Synthetic "Normal" Data (Unchanged) ---
-print(f"Generating {NUM_SAMPLES} samples of 'normal' data...")
-np.random.seed(42)
-humidity_data = 0.20 + (0.95 - 0.20) * np.random.rand(NUM_SAMPLES)
-noise = np.random.normal(0, 15, NUM_SAMPLES)
-yield_data = (humidity_data * YIELD_FACTOR) + noise
-df = pd.DataFrame({'humidity': humidity_data, 'yield': yield_data})
-df['yield'] = df['yield'].clip(lower=0)
-print("Synthetic data generated successfully.")
-
-# --- 3. Calculate Descriptive Statistics ---
-print("Calculating mean and standard deviation of the 'yield' data...")
-mean_yield = df['yield'].mean()
-std_dev_yield = df['yield'].std()
-
-print(f"Mean Yield: {mean_yield}")
-print(f"Standard Deviation: {std_dev_yield}")
+CHUNK_SIZE = 10_000
+MODEL_FILE_NAME = "model_stats.json"
+NOISE_FRACTION = 0.10
+
+parser = argparse.ArgumentParser(description="Bootstrap or retrain the online anomaly statistics")
+parser.add_argument("--samples", type=int, default=NUM_SAMPLES, help="synthetic 'normal' samples to bootstrap from")
+parser.add_argument("--history", help="NDJSON of served results (e.g. simulate_bulk.py output) to replay, streamed line by line")
+parser.add_argument("--output", default=MODEL_FILE_NAME)
+args = parser.parse_args()
+
+model = OnlineAnomalyModel()
+
+# --- 2. Stream Synthetic "Normal" Data ---
+# Yield per m^2 over typical humidity (20-95%), with multiplicative noise.
+# Generated and folded in chunk by chunk, so the sample count does not affect memory.
+print(f"Streaming {args.samples} samples of synthetic 'normal' data...")
+rng = np.random.default_rng(42)
+remaining = args.samples
+while remaining > 0:
+    size = min(CHUNK_SIZE, remaining)
+    humidity = rng.uniform(0.20, 0.95, size)
+    noise = rng.normal(0, NOISE_FRACTION, size)
+    yield_per_sq_meter = np.clip(BASELINE_YIELD_PER_SQ_METER * humidity / BASELINE_HUMIDITY * (1 + noise), 0, None)
+    model.global_stats.update_batch(yield_per_sq_meter)
+    remaining -= size
+
+# --- 3. Replay Served History (Optional) ---
+if args.history:
+    print(f"Replaying served results from '{args.history}'...")
+    replayed = 0
+    with open(args.history) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "error" in record or record.get("anomaly_flag"):
+                continue
+            model.update(WeatherCache.normalize_key(record["location"]), record["estimated_yield_liters_per_day"] / record["surface_area"])
+            replayed += 1
+    print(f"Replayed {replayed} results across {len(model.locations)} locations.")
+
+print(f"Mean Yield per m^2: {model.global_stats.mean}")
+print(f"Standard Deviation: {model.global_stats.std}")
 
 # --- 4. Save the Statistics to a File ---
-stats = {
-    "mean_yield": mean_yield,
-    "std_dev_yield": std_dev_yield
-}
-with open(MODEL_FILE_NAME, 'w') as f:
-    json.dump(stats, f)
-
-print(f"--- Model statistics saved to '{MODEL_FILE_NAME}' successfully! ---")
\ No newline at end of file
+model.snapshot(args.output)
+
+print(f"--- Model statistics saved to '{args.output}' successfully! ---")
@@ -0,0 +1,135 @@
+"""
+In-process cache in front of the OpenWeatherMap lookup.
+
+Entries are keyed on the normalized city name and go through three states:
+fresh (served straight from memory), stale (served from memory while a single
+background refresh runs) and expired (the caller waits for a new upstream
+call). Concurrent misses for the same city share one in-flight fetch.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional
+
+
+class CacheEntry:
+    __slots__ = ("value", "fetched_at")
+
+    def __init__(self, value: dict, fetched_at: float):
+        self.value = value
+        self.fetched_at = fetched_at
+
+
+class WeatherCache:
+    def __init__(
+        self,
+        fetcher: Callable[[str], Awaitable[dict]],
+        ttl_seconds: float = 300.0,
+        stale_seconds: float = 600.0,
+        max_entries: int = 1024,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._fetcher = fetcher
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._counters = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "refreshes": 0,
+            "refresh_errors": 0,
+            "evictions": 0,
+        }
+
+    @staticmethod
+    def normalize_key(city: str) -> str:
+        # "  New   York " and "new york" should share one entry.
+        return " ".join(city.split()).casefold()
+
+    async def get(self, city: str) -> dict:
+        key = self.normalize_key(city)
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = self._clock() - entry.fetched_at
+            if age < self.ttl_seconds:
+                self._counters["hits"] += 1
+                self._entries.move_to_end(key)
+                return entry.value
+            if age < self.ttl_seconds + self.stale_seconds:
+                self._counters["stale_hits"] += 1
+                self._entries.move_to_end(key)
+                if key not in self._inflight:
+                    self._counters["refreshes"] += 1
+                    task = self._start_fetch(key, city)
+                    task.add_done_callback(self._on_background_refresh_done)
+                return entry.value
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self._counters["coalesced"] += 1
+        else:
+            self._counters["misses"] += 1
+            task = self._start_fetch(key, city)
+            task.add_done_callback(self._on_shared_fetch_done)
+        # shield() so a cancelled caller does not cancel the fetch other callers share.
+        return await asyncio.shield(task)
+
+    def get_entry(self, city: str) -> Optional[CacheEntry]:
+        return self._entries.get(self.normalize_key(city))
+
+    def fresh_for(self, city: str) -> float:
+        """Seconds until the cached snapshot for `city` goes stale (0 if stale or absent)."""
+        entry = self.get_entry(city)
+        if entry is None:
+            return 0.0
+        return max(0.0, self.ttl_seconds - (self._clock() - entry.fetched_at))
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self._counters["hits"] + self._counters["stale_hits"] + self._counters["misses"] + self._counters["coalesced"]
+        served_from_memory = self._counters["hits"] + self._counters["stale_hits"]
+        return {
+            **self._counters,
+            "size": len(self._entries),
+            "inflight": len(self._inflight),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "stale_seconds": self.stale_seconds,
+            "hit_ratio": round(served_from_memory / lookups, 4) if lookups else 0.0,
+        }
+
+    def _start_fetch(self, key: str, city: str) -> asyncio.Task:
+        task = asyncio.ensure_future(self._fetch_and_store(key, city.strip()))
+        self._inflight[key] = task
+        return task
+
+    async def _fetch_and_store(self, key: str, city: str) -> dict:
+        try:
+            value = await self._fetcher(city)
+            self._entries[key] = CacheEntry(value, self._clock())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    @staticmethod
+    def _on_shared_fetch_done(task: asyncio.Task) -> None:
+        # Every caller may have been cancelled (e.g. client disconnects) before a failed
+        # fetch finished; retrieve the error so it is not logged as never retrieved.
+        if not task.cancelled():
+            task.exception()
+
+    def _on_background_refresh_done(self, task: asyncio.Task) -> None:
+        # The stale value keeps being served until a refresh succeeds or the entry expires.
+        if not task.cancelled() and task.exception() is not None:
+            self._counters["refresh_errors"] += 1
@@ -0,0 +1,214 @@
+"""
+Application-scoped HTTP client for the weather upstream.
+
+One pooled httpx.AsyncClient is shared by every request (opened and closed by
+the FastAPI lifespan), with explicit timeouts, a bounded retry budget with
+jittered backoff and a circuit breaker that fails fast while the upstream is down.
+httpx is imported when the pool is opened, not when this module is imported.
+"""
+import asyncio
+import random
+import time
+from typing import Callable, Optional
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class UpstreamError(Exception):
+    pass
+
+
+class CircuitOpenError(UpstreamError):
+    """Raised instead of calling the upstream while the breaker is open."""
+
+
+class UpstreamTimeoutError(UpstreamError):
+    pass
+
+
+class UpstreamConnectionError(UpstreamError):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._trial_in_flight = False
+
+    def allow_request(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open" and self._clock() - self.opened_at >= self.reset_seconds:
+            self.state = "half_open"
+        if self.state == "half_open" and not self._trial_in_flight:
+            # Let exactly one trial call through; its outcome decides the next state.
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self._trial_in_flight = False
+
+    def release_trial(self) -> None:
+        # The call ended without saying anything about the upstream (cancelled, or
+        # failed locally); free the half-open slot so the next call can probe instead.
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        self._trial_in_flight = False
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            if self.state != "open":
+                self.times_opened += 1
+            self.state = "open"
+            self.opened_at = self._clock()
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+        }
+
+
+class RetryBudget:
+    """
+    Token bucket that caps retries to a fraction of overall traffic, so a
+    struggling upstream is not hit with a multiple of the normal request rate.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_tokens: float = 10.0, max_tokens: float = 100.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = min_tokens
+
+    def deposit(self) -> None:
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def try_withdraw(self) -> bool:
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+
+class WeatherClient:
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        connect_timeout: float = 3.0,
+        read_timeout: float = 5.0,
+        max_retries: int = 2,
+        retry_backoff_seconds: float = 0.1,
+        retry_budget: Optional[RetryBudget] = None,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.retry_budget = retry_budget or RetryBudget()
+        self.breaker = breaker or CircuitBreaker()
+        self._client = None
+        self._counters = {"requests": 0, "retries": 0, "retries_denied": 0, "short_circuited": 0}
+
+    async def start(self) -> None:
+        if self._client is None:
+            import httpx
+
+            limits = httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.keepalive_expiry,
+            )
+            timeout = httpx.Timeout(connect=self.connect_timeout, read=self.read_timeout, write=self.read_timeout, pool=self.connect_timeout)
+            self._client = httpx.AsyncClient(limits=limits, timeout=timeout)
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def get(self, url: str, params: Optional[dict] = None, breaker: Optional[CircuitBreaker] = None, max_retries: Optional[int] = None):
+        """
+        Returns the httpx.Response, or raises CircuitOpenError, UpstreamTimeoutError
+        or UpstreamConnectionError once retries are exhausted.
+
+        `breaker` and `max_retries` override the client's own for one call, so a
+        best-effort endpoint can share the pool without tripping the main breaker.
+        """
+        breaker = breaker or self.breaker
+        max_retries = self.max_retries if max_retries is None else max_retries
+        # Serverless runtimes may not run lifespan hooks, so open the pool on first use too.
+        if self._client is None:
+            await self.start()
+        import httpx
+
+        self._counters["requests"] += 1
+        self.retry_budget.deposit()
+
+        attempt = 0
+        while True:
+            if not breaker.allow_request():
+                self._counters["short_circuited"] += 1
+                raise CircuitOpenError("Weather upstream circuit is open.")
+            try:
+                response = await self._client.get(url, params=params)
+            except httpx.PoolTimeout as exc:
+                # Our own pool is exhausted; the upstream may be perfectly healthy.
+                breaker.release_trial()
+                raise UpstreamTimeoutError(str(exc)) from exc
+            except httpx.TransportError as exc:
+                breaker.record_failure()
+                if not self._should_retry(attempt, max_retries):
+                    if isinstance(exc, httpx.TimeoutException):
+                        raise UpstreamTimeoutError(str(exc)) from exc
+                    raise UpstreamConnectionError(str(exc)) from exc
+            except httpx.HTTPError as exc:
+                # A reply we could not use (undecodable body, redirect loop): the upstream misbehaved.
+                breaker.record_failure()
+                raise UpstreamConnectionError(str(exc)) from exc
+            except BaseException:
+                # E.g. CancelledError at shutdown or on client disconnect.
+                breaker.release_trial()
+                raise
+            else:
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    # 4xx such as "city not found" means the upstream is healthy.
+                    breaker.record_success()
+                    return response
+                breaker.record_failure()
+                if not self._should_retry(attempt, max_retries):
+                    return response
+            attempt += 1
+            self._counters["retries"] += 1
+            # Full jitter: sleep anywhere in [0, base * 2^attempt).
+            await asyncio.sleep(random.uniform(0, self.retry_backoff_seconds * (2 ** attempt)))
+
+    def _should_retry(self, attempt: int, max_retries: int) -> bool:
+        if attempt >= max_retries:
+            return False
+        if not self.retry_budget.try_withdraw():
+            self._counters["retries_denied"] += 1
+            return False
+        return True
+
+    def stats(self) -> dict:
+        return {
+            **self._counters,
+            "retry_tokens": round(self.retry_budget.tokens, 2),
+            "circuit": self.breaker.stats(),
+        }
@@ -0,0 +1,181 @@
+"""
+Precomputed yield lookup grid for what-if sweeps.
+
+Yield is linear in surface area, so the grid stores the daily yield per square
+meter over a humidity x temperature mesh and queries scale by area. The table is
+saved as a raw .npy (memory-mapped at load time) with its version in
+yield_grid.json, next to model_stats.json. The version is a hash of the model
+parameters and axes, so the table is only rebuilt when those change.
+
+Usage:
+    python yield_grid.py          # rebuild if stale, then run the accuracy check
+    python yield_grid.py --force  # always rebuild
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+from dataclasses import asdict
+
+import numpy as np
+
+from simulation import DEFAULT_FACADE_PARAMETERS, FacadeParameters, calculate_water_harvest
+from simulation_batch import round_2dp
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+GRID_FILE = os.path.join(BASE_DIR, "yield_grid.npy")
+GRID_META_FILE = os.path.join(BASE_DIR, "yield_grid.json")
+
+# (start, stop, count) for each axis.
+HUMIDITY_AXIS = (0.0, 1.0, 201)
+TEMPERATURE_AXIS = (-30.0, 50.0, 81)
+
+
+def yield_rate_per_sq_meter(relative_humidity, temperature_celsius, params: FacadeParameters = DEFAULT_FACADE_PARAMETERS) -> np.ndarray:
+    """Unrounded liters per m^2 per day under constant conditions."""
+    humidity = np.clip(np.asarray(relative_humidity, dtype=np.float64), 0.0, None)
+    temperature = np.asarray(temperature_celsius, dtype=np.float64)
+    temperature_factor = np.clip(1.0 + params.temperature_coefficient * (temperature - params.reference_temperature_celsius), 0.0, None)
+    return params.baseline_yield_per_sq_meter * (humidity / params.baseline_humidity) * temperature_factor
+
+
+def grid_version(params: FacadeParameters = DEFAULT_FACADE_PARAMETERS) -> str:
+    spec = {"params": asdict(params), "humidity_axis": HUMIDITY_AXIS, "temperature_axis": TEMPERATURE_AXIS}
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+class YieldGrid:
+    def __init__(self, table: np.ndarray, params: FacadeParameters = DEFAULT_FACADE_PARAMETERS):
+        self.table = table
+        self.params = params
+        self.humidity_axis = np.linspace(*HUMIDITY_AXIS)
+        self.temperature_axis = np.linspace(*TEMPERATURE_AXIS)
+
+    @classmethod
+    def build(cls, params: FacadeParameters = DEFAULT_FACADE_PARAMETERS) -> "YieldGrid":
+        humidity, temperature = np.meshgrid(np.linspace(*HUMIDITY_AXIS), np.linspace(*TEMPERATURE_AXIS), indexing="ij")
+        return cls(yield_rate_per_sq_meter(humidity, temperature, params), params)
+
+    def rate(self, relative_humidity, temperature_celsius) -> np.ndarray:
+        """
+        Bilinear interpolation of the per-m^2 rate. Points outside the grid are
+        computed directly from the model instead of being clamped.
+        """
+        humidity, temperature = np.broadcast_arrays(
+            np.asarray(relative_humidity, dtype=np.float64), np.asarray(temperature_celsius, dtype=np.float64)
+        )
+        h_step = self.humidity_axis[1] - self.humidity_axis[0]
+        t_step = self.temperature_axis[1] - self.temperature_axis[0]
+        h_pos = (humidity - self.humidity_axis[0]) / h_step
+        t_pos = (temperature - self.temperature_axis[0]) / t_step
+        inside = (h_pos >= 0) & (h_pos <= len(self.humidity_axis) - 1) & (t_pos >= 0) & (t_pos <= len(self.temperature_axis) - 1)
+
+        h_pos = np.clip(h_pos, 0, len(self.humidity_axis) - 1)
+        t_pos = np.clip(t_pos, 0, len(self.temperature_axis) - 1)
+        h0 = np.minimum(h_pos.astype(np.intp), len(self.humidity_axis) - 2)
+        t0 = np.minimum(t_pos.astype(np.intp), len(self.temperature_axis) - 2)
+        h_frac = h_pos - h0
+        t_frac = t_pos - t0
+        table = self.table
+        interpolated = (
+            table[h0, t0] * (1 - h_frac) * (1 - t_frac)
+            + table[h0 + 1, t0] * h_frac * (1 - t_frac)
+            + table[h0, t0 + 1] * (1 - h_frac) * t_frac
+            + table[h0 + 1, t0 + 1] * h_frac * t_frac
+        )
+        if inside.all():
+            return interpolated
+        return np.where(inside, interpolated, yield_rate_per_sq_meter(humidity, temperature, self.params))
+
+    def sweep(self, surface_areas, relative_humidities, temperature_celsius: float) -> np.ndarray:
+        """Rounded daily yields shaped (humidities, areas)."""
+        surface_areas = np.clip(np.asarray(surface_areas, dtype=np.float64), 0.0, None)
+        rates = self.rate(relative_humidities, temperature_celsius)
+        return round_2dp(rates[:, np.newaxis] * surface_areas[np.newaxis, :])
+
+
+def save_grid(grid: YieldGrid, version: str) -> None:
+    np.save(GRID_FILE, grid.table)
+    meta = {
+        "version": version,
+        "file": os.path.basename(GRID_FILE),
+        "dtype": str(grid.table.dtype),
+        "shape": list(grid.table.shape),
+        "humidity_axis": list(HUMIDITY_AXIS),
+        "temperature_axis": list(TEMPERATURE_AXIS),
+        "params": asdict(grid.params),
+    }
+    with open(GRID_META_FILE, "w") as f:
+        json.dump(meta, f, indent=2)
+
+
+def saved_version() -> str:
+    try:
+        with open(GRID_META_FILE) as f:
+            return json.load(f).get("version", "")
+    except (OSError, ValueError):
+        return ""
+
+
+def load_grid(params: FacadeParameters = DEFAULT_FACADE_PARAMETERS) -> YieldGrid:
+    """
+    Memory-maps the saved table if its version matches the current model.
+    Otherwise builds a fresh table and tries to save it (read-only deployments
+    just keep the in-memory copy).
+    """
+    version = grid_version(params)
+    if saved_version() == version:
+        try:
+            return YieldGrid(np.load(GRID_FILE, mmap_mode="r"), params)
+        except (OSError, ValueError):
+            pass
+    grid = YieldGrid.build(params)
+    try:
+        save_grid(grid, version)
+    except OSError:
+        pass
+    return grid
+
+
+def check_accuracy(grid: YieldGrid, samples: int = 100_000, seed: int = 0) -> dict:
+    """
+    Compares grid answers with calculate_water_harvest on random points.
+    Results may differ by one rounding step (0.01 L) where the unrounded value
+    sits on a rounding boundary; anything larger is a failure.
+    """
+    rng = np.random.default_rng(seed)
+    areas = rng.uniform(0.1, 5_000.0, samples)
+    humidities = rng.uniform(0.0, 1.0, samples)
+    temperatures = rng.uniform(*TEMPERATURE_AXIS[:2], samples)
+    grid_yields = round_2dp(grid.rate(humidities, temperatures) * areas)
+    scalar_yields = np.array([calculate_water_harvest(float(a), float(h)) for a, h in zip(areas, humidities)])
+    errors = np.abs(grid_yields - scalar_yields)
+    return {
+        "samples": samples,
+        "exact_matches": int(np.count_nonzero(errors == 0)),
+        "max_abs_error": float(errors.max()),
+        "passed": bool(errors.max() <= 0.01 + 1e-9),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build and verify the yield lookup grid")
+    parser.add_argument("--force", action="store_true", help="rebuild even if the saved grid is current")
+    args = parser.parse_args()
+
+    print("--- Yield Grid Build ---")
+    version = grid_version()
+    if args.force or saved_version() != version:
+        grid = YieldGrid.build()
+        save_grid(grid, version)
+        print(f"Rebuilt grid version {version} -> '{os.path.basename(GRID_FILE)}'")
+    else:
+        grid = load_grid()
+        print(f"Grid version {version} is current.")
+
+    # The accuracy check only applies to the default parameters calculate_water_harvest implements.
+    report = check_accuracy(grid)
+    print(f"Accuracy vs calculate_water_harvest: {report}")
+    if not report["passed"]:
+        sys.exit(1)